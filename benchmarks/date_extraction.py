@@ -0,0 +1,93 @@
+"""
+Micro-benchmark of the combined date engine (find_latest_date) against
+the per-pattern implementation (find_all_dates_with_regex + get_latest_date).
+Both implementations are checked to return the same date for every generated text.
+
+Run from the repository root:
+    python -m benchmarks.date_extraction
+"""
+import argparse
+import random
+import timeit
+
+from utils.url_scraper import (DATE_FORMATS, DATE_PATTERNS, find_all_dates_with_regex, get_latest_date,
+                               find_latest_date, parse_date_cached)
+
+WORDS = ["wire", "federation", "backend", "the", "client", "release", "notes", "Friday", "May", "Sep",
+         "March", "team", "version", "deploy", "helm", "chart", "Monday", "update", "of", "on"]
+
+
+def random_date(rng: random.Random) -> str:
+    date = rng.choice(["2021-03-04", "1999-12-31", "2024-09-20", "2023-02-28"])
+    year, month, day = date.split("-")
+    month_name = ["January", "February", "March", "April", "May", "June", "July", "August",
+                  "September", "October", "November", "December"][int(month) - 1]
+    templates = [
+        f"{year}-{month}-{day}", f"{year}/{month}/{day}", f"{month}-{day}-{year}", f"{day}/{month}/{year}",
+        f"{int(day)} {month_name} {year}", f"{month_name} {int(day)}, {year}", f"{day} {month_name[:3]} {year}",
+        f"{month_name[:3]} {day}, {year}", f"{day}-{month_name[:3]}-{year}", f"{month_name[:3]}-{day}-{year}",
+        f"Friday, {day} {month_name} {year}", f"Friday, {month_name} {day}, {year}", f"{year}.{month}.{day}",
+        f"{day}.{month}.{year}", f"{year} {month_name[:3]} {day}", f"{year} {month_name} {day}",
+        f"{day} {month_name}, {year}", f"{month_name} {day} {year}",
+        # Near misses and ambiguous values
+        f"{day}-{month}-{year}", f"13/13/{year}", f"{year}-13-45", f"Hello, {day} {month_name} {year}",
+        f"{year} {month_name} {day} {year}", f"{month}-{day}-{year}-{month}-{day}",
+    ]
+    return rng.choice(templates)
+
+
+def generate_text(rng: random.Random, words: int, date_every: int) -> str:
+    parts = []
+    for i in range(words):
+        parts.append(random_date(rng) if i % date_every == 0 else rng.choice(WORDS))
+    return " ".join(parts)
+
+
+def reference_latest_date(text: str) -> str:
+    return get_latest_date(find_all_dates_with_regex(text, DATE_PATTERNS), DATE_FORMATS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=5000, help="words per generated page")
+    parser.add_argument("--date-every", type=int, default=50, help="insert a date every N words")
+    parser.add_argument("--pages", type=int, default=20, help="number of generated pages")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [generate_text(rng, args.words, args.date_every) for _ in range(args.pages)]
+
+    # Short pages full of dates exercise overlapping matches
+    for _ in range(2000):
+        text = generate_text(rng, 12, 2)
+        assert find_latest_date(text, DATE_FORMATS, DATE_PATTERNS) == reference_latest_date(text), text
+    for text in pages:
+        assert find_latest_date(text, DATE_FORMATS, DATE_PATTERNS) == reference_latest_date(text)
+    print("Results match the per-pattern implementation")
+
+    def run_reference():
+        for text in pages:
+            reference_latest_date(text)
+
+    def run_engine():
+        for text in pages:
+            find_latest_date(text, DATE_FORMATS, DATE_PATTERNS)
+
+    def run_engine_cold():
+        parse_date_cached.cache_clear()
+        run_engine()
+
+    reference = min(timeit.repeat(run_reference, number=1, repeat=args.repeat))
+    engine_cold = min(timeit.repeat(run_engine_cold, number=1, repeat=args.repeat))
+    engine = min(timeit.repeat(run_engine, number=1, repeat=args.repeat))
+
+    print(f"{args.pages} pages x {args.words} words, date every {args.date_every} words")
+    print(f"per-pattern findall + strptime: {reference * 1000:8.2f} ms")
+    print(f"combined engine (cold cache):   {engine_cold * 1000:8.2f} ms  ({reference / engine_cold:.1f}x)")
+    print(f"combined engine (warm cache):   {engine * 1000:8.2f} ms  ({reference / engine:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Local stand-in for the OpenAI chat completions API, answering every prompt with the same text
+word by word after a fixed delay per token. Lets the Gradio app and the pipelines run offline.
+
+Run from the repository root:
+    python -m benchmarks.openai_stub --port 8089 --token-delay 0.05
+and point the OpenAI client to it:
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=stub python gradio_interface.py
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+from aiohttp import web
+
+DEFAULT_REPLY = ("Wire is a secure collaboration platform with end-to-end encrypted messaging, calls and file sharing. "
+                 "This answer comes from a local stub of the OpenAI API.")
+
+
+def split_tokens(text: str) -> list[str]:
+    """Splits text into word-like pieces, roughly the way a model streams them."""
+    return re.findall(r"\s*\S+", text)
+
+
+def completion_chunk(completion_id: str, model: str, content: str | None, finish_reason: str | None) -> dict:
+    delta = {"content": content} if content is not None else {}
+    return {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+
+def make_app(reply=DEFAULT_REPLY, token_delay=0.02, first_token_delay=0.0) -> web.Application:
+    """
+    reply - text of every answer
+    token_delay - seconds between streamed tokens (also applied to non-streamed answers)
+    first_token_delay - seconds before the first token, simulating prompt processing
+    """
+    tokens = split_tokens(reply)
+
+    async def chat_completions(request: web.Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        completion_id = f"chatcmpl-stub-{time.monotonic_ns()}"
+        prompt_tokens = sum(len(split_tokens(str(message.get("content", "")))) for message in body.get("messages", []))
+        await asyncio.sleep(first_token_delay)
+
+        if not body.get("stream"):
+            await asyncio.sleep(token_delay * len(tokens))
+            return web.json_response({
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                          "total_tokens": prompt_tokens + len(tokens)},
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        for token in tokens:
+            await asyncio.sleep(token_delay)
+            chunk = completion_chunk(completion_id, model, token, None)
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(f"data: {json.dumps(completion_chunk(completion_id, model, None, 'stop'))}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between tokens")
+    parser.add_argument("--first-token-delay", type=float, default=0.0, help="seconds before the first token")
+    parser.add_argument("--reply", default=DEFAULT_REPLY, help="text of every answer")
+    args = parser.parse_args()
+    web.run_app(make_app(args.reply, args.token_delay, args.first_token_delay), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
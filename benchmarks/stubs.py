@@ -0,0 +1,201 @@
+"""
+Local stand-ins of the external services used by the benchmarks:
+a synthetic documentation site, a fake GitHub API with rate limit headers and a hashing query embedder.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+import numpy as np
+from aiohttp import web
+from haystack import component
+
+WORDS = ["wire", "federation", "backend", "client", "release", "team", "conversation", "message", "encrypted",
+         "deploy", "helm", "chart", "server", "guest", "legal", "hold", "calling", "certificate", "domain", "user"]
+
+
+def lorem(rng: np.random.Generator, words: int) -> str:
+    return " ".join(rng.choice(WORDS, size=words)) + "."
+
+
+def make_docs_site_app(depth=3, branching=5, sections=4, words=80) -> web.Application:
+    """
+    Synthetic documentation site: a tree of pages under /docs/ (page 0 is the root, page i links to its children,
+    the root, itself with a fragment and an external site), every page has dated sections with paragraphs and code.
+    Has 1 + branching + ... + branching^depth pages.
+    """
+    pages = sum(branching ** level for level in range(depth + 1))
+
+    def render(number: int) -> str:
+        rng = np.random.default_rng(number)
+        links = [f'<a href="/docs/page-{child}.html">child {child}</a>'
+                 for child in range(number * branching + 1, min(number * branching + branching + 1, pages))]
+        links += ['<a href="/docs/page-0.html">home</a>', f'<a href="/docs/page-{number}.html#top">top</a>',
+                  '<a href="https://example.com/elsewhere">elsewhere</a>']
+        date = f"{2020 + number % 5}-0{1 + number % 9}-1{number % 10}"
+        body = [f"<h1>Page {number}</h1>", f"<p>Last updated on {date}.</p>"]
+        for section in range(sections):
+            body.append(f"<h2>Section {section} of page {number}</h2>")
+            body.extend(f"<p>{lorem(rng, words)}</p>" for _ in range(3))
+            body.append(f"<pre>helm upgrade --install wire-server-{section} ./charts/wire-server\n"
+                        f"  --set replicas={section}</pre>")
+        return (f"<html><head><title>Docs page {number}</title></head><body><nav>{' '.join(links)}</nav>"
+                f"{''.join(body)}</body></html>")
+
+    async def page(request: web.Request):
+        number = int(request.match_info["number"])
+        if number >= pages:
+            raise web.HTTPNotFound()
+        return web.Response(text=render(number), content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/docs/page-{number:\\d+}.html", page)
+    app["pages"] = pages
+    return app
+
+
+def make_github_app(base_url_holder: dict, repos=4, files_per_repo=10, limit=5000, window=60,
+                    latency=0.0) -> web.Application:
+    """
+    Fake GitHub REST API (org repos, git trees, contents, commits) and raw file downloads under /raw/.
+    API responses carry X-RateLimit-* headers, once limit requests were made in a window of the given seconds
+    the API answers 403 with X-RateLimit-Remaining: 0 until the reset.
+    base_url_holder - dict whose "url" is set to the server address once it's known (for download_url fields)
+    latency - seconds added to every response
+    """
+    state = {"window_start": time.time(), "used": 0, "api_calls": 0, "raw_calls": 0, "rejected": 0}
+    files = {}
+    for repo in range(repos):
+        paths = ["README.md", ".github/PULL_REQUEST_TEMPLATE.md", "src/main.py"]
+        paths += [f"docs/{'guides/' if i % 2 else ''}page-{i}.md" for i in range(files_per_repo - 1)]
+        files[f"wireapp/repo-{repo}"] = paths
+
+    def rate_limit_headers() -> dict:
+        reset = state["window_start"] + window
+        return {"X-RateLimit-Limit": str(limit), "X-RateLimit-Remaining": str(max(limit - state["used"], 0)),
+                "X-RateLimit-Reset": str(int(reset) + 1)}
+
+    @web.middleware
+    async def rate_limit(request: web.Request, handler):
+        await asyncio.sleep(latency)
+        if request.path.startswith("/raw/"):
+            state["raw_calls"] += 1
+            return await handler(request)
+        state["api_calls"] += 1
+        if time.time() >= state["window_start"] + window:
+            state["window_start"] = time.time()
+            state["used"] = 0
+        if state["used"] >= limit:
+            state["rejected"] += 1
+            return web.json_response({"message": "API rate limit exceeded"}, status=403, headers=rate_limit_headers())
+        state["used"] += 1
+        response = await handler(request)
+        response.headers.update(rate_limit_headers())
+        return response
+
+    async def org_repos(request: web.Request):
+        per_page = int(request.query.get("per_page", 30))
+        page = int(request.query.get("page", 1))
+        names = list(files)[(page - 1) * per_page:page * per_page]
+        return web.json_response([{"full_name": name, "name": name.split("/")[1], "default_branch": "main"}
+                                  for name in names])
+
+    async def tree(request: web.Request):
+        paths = files.get(f"{request.match_info['owner']}/{request.match_info['repo']}", [])
+        directories = sorted({"/".join(path.split("/")[:i]) for path in paths for i in range(1, path.count("/") + 1)})
+        entries = [{"path": path, "type": "tree"} for path in directories]
+        entries += [{"path": path, "type": "blob"} for path in paths]
+        return web.json_response({"tree": entries, "truncated": False})
+
+    async def contents(request: web.Request):
+        repo = f"{request.match_info['owner']}/{request.match_info['repo']}"
+        directory = request.match_info.get("path", "").strip("/")
+        prefix = f"{directory}/" if directory else ""
+        items = {}
+        for path in files.get(repo, []):
+            if not path.startswith(prefix):
+                continue
+            name = path[len(prefix):].split("/")[0]
+            if "/" in path[len(prefix):]:
+                items[name] = {"type": "dir", "name": name, "path": prefix + name}
+            else:
+                items[name] = {"type": "file", "name": name, "path": path,
+                               "download_url": f"{base_url_holder['url']}/raw/{repo}/main/{path}",
+                               "html_url": f"https://github.com/{repo}/blob/main/{path}"}
+        return web.json_response(list(items.values()))
+
+    async def commits(request: web.Request):
+        day = 1 + len(request.query.get("path", "")) % 28
+        return web.json_response([{"commit": {"committer": {"date": f"2024-03-{day:02d}T10:00:00Z"}}}])
+
+    async def raw(request: web.Request):
+        rng = np.random.default_rng(len(request.match_info["path"]))
+        text = f"# {request.match_info['path']}\n\n" + "\n\n".join(
+            f"## Part {i}\n\n{lorem(rng, 120)}\n\n```bash\nmake deploy-{i}\n```" for i in range(3))
+        return web.Response(text=text)
+
+    app = web.Application(middlewares=[rate_limit])
+    app.router.add_get("/orgs/{org}/repos", org_repos)
+    app.router.add_get("/repos/{owner}/{repo}/git/trees/{branch}", tree)
+    app.router.add_get("/repos/{owner}/{repo}/contents/{path:.*}", contents)
+    app.router.add_get("/repos/{owner}/{repo}/commits", commits)
+    app.router.add_get("/raw/{owner}/{repo}/{branch}/{path:.*}", raw)
+    app["state"] = state
+    app["files"] = files
+    return app
+
+
+def serve_in_thread(app: web.Application) -> tuple[str, callable]:
+    """
+    Serves the app on a free local port from a background thread with its own event loop,
+    so it keeps answering while the caller blocks (e.g. in requests).
+    Returns base url and a function stopping the server.
+    """
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    holder = {}
+
+    async def start():
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        holder["runner"] = runner
+        holder["port"] = site._server.sockets[0].getsockname()[1]
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(start())
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(holder["runner"].cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return f"http://127.0.0.1:{holder['port']}", stop
+
+
+@component
+class HashTextEmbedder:
+    """
+    Stand-in for SentenceTransformersTextEmbedder: a deterministic pseudo-random unit vector per text,
+    after latency seconds (e.g. the measured latency of the real model).
+    """
+
+    def __init__(self, dimension=384, latency=0.0):
+        self.dimension = dimension
+        self.latency = latency
+
+    @component.output_types(embedding=list[float])
+    def run(self, text: str):
+        if self.latency:
+            time.sleep(self.latency)
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        vector = np.random.default_rng(seed).normal(size=self.dimension)
+        return {"embedding": (vector / np.linalg.norm(vector)).tolist()}
@@ -0,0 +1,213 @@
+"""
+Offline benchmark suite, every external service is replaced by a local stand-in:
+a synthetic docs site and a fake GitHub API (benchmarks.stubs), the local vector store
+and a stub of the OpenAI API with configurable latency (benchmarks.openai_stub).
+
+Measures:
+    crawl    - pages/sec of start_scraping, sections/sec of extract_content_and_metadata and crawl_and_extract
+    github   - API calls per file and files/sec of scrape_md_files ("tree" and "contents" listing)
+    query    - p50/p95 latency of ask_question under concurrent load
+
+Results are saved as JSON (default benchmarks/results/<commit>-<time>.json) to compare versions.
+
+Run from the repository root:
+    python -m benchmarks.suite
+    python -m benchmarks.suite --only query --concurrency 1 8 32 --token-delay 0.01
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import numpy as np
+import yaml
+from haystack import Document, Pipeline
+from benchmarks.openai_stub import make_app as make_openai_app
+from benchmarks.stubs import HashTextEmbedder, WORDS, make_docs_site_app, make_github_app, serve_in_thread
+from utils import github_scraper
+from utils.local_document_store import LocalDocumentStore
+from utils.question_answering import ask_question
+from utils.serving import LatencyStats
+from utils.url_scraper import DATE_FORMATS, DATE_PATTERNS, crawl_and_extract, extract_content_and_metadata, \
+    start_scraping
+
+
+def benchmark_crawl(args) -> dict:
+    app = make_docs_site_app(args.site_depth, args.site_branching)
+    base_url, stop = serve_in_thread(app)
+    entry_url = f"{base_url}/docs/page-0.html"
+    list_data = {"white_list": [base_url], "black_list": []}
+    try:
+        start = time.perf_counter()
+        urls = asyncio.run(start_scraping(entry_url, args.site_depth, list_data))
+        crawl_seconds = time.perf_counter() - start
+
+        async def crawl_sections():
+            return [section async for section in crawl_and_extract(entry_url, args.site_depth, DATE_FORMATS,
+                                                                   DATE_PATTERNS, list_data)]
+
+        start = time.perf_counter()
+        sections = asyncio.run(crawl_sections())
+        single_pass_seconds = time.perf_counter() - start
+
+        # Same loop as the notebook, one page after another
+        start = time.perf_counter()
+        extracted = []
+        for url in urls:
+            extracted += extract_content_and_metadata(url, DATE_FORMATS, DATE_PATTERNS) or []
+        extract_seconds = time.perf_counter() - start
+    finally:
+        stop()
+    return {
+        "site_pages": app["pages"],
+        "start_scraping": {"pages": len(urls), "seconds": crawl_seconds, "pages_per_sec": len(urls) / crawl_seconds},
+        "extract_content_and_metadata": {"pages": len(urls), "sections": len(extracted), "seconds": extract_seconds,
+                                         "sections_per_sec": len(extracted) / extract_seconds},
+        "crawl_and_extract": {"sections": len(sections), "seconds": single_pass_seconds,
+                              "sections_per_sec": len(sections) / single_pass_seconds},
+    }
+
+
+def benchmark_github(args) -> dict:
+    results = {}
+    for listing in ("tree", "contents"):
+        holder = {}
+        app = make_github_app(holder, args.repos, args.files_per_repo, args.rate_limit, args.rate_limit_window,
+                              args.api_latency)
+        base_url, stop = serve_in_thread(app)
+        holder["url"] = base_url
+        github_scraper.GITHUB_API_URL = base_url
+        github_scraper.GITHUB_RAW_URL = f"{base_url}/raw"
+        rate_limiter = github_scraper.RateLimiter(requests_per_second=args.github_rps, burst=args.github_rps * 2)
+        try:
+            start = time.perf_counter()
+            md_files = asyncio.run(github_scraper.scrape_md_files("wireapp", "token", listing=listing,
+                                                                  rate_limiter=rate_limiter))
+            seconds = time.perf_counter() - start
+        finally:
+            stop()
+        state = app["state"]
+        report = rate_limiter.report()
+        results[listing] = {
+            "files": len(md_files), "seconds": seconds, "files_per_sec": len(md_files) / seconds,
+            "requests_per_file": report["requests"] / len(md_files),
+            "api_calls_per_file": state["api_calls"] / len(md_files),
+            "raw_downloads_per_file": state["raw_calls"] / len(md_files),
+            "rate_limited": state["rejected"], "paused_seconds": report["paused_seconds"],
+        }
+    return results
+
+
+def build_query_pipeline(args, store_dir: str, openai_url: str) -> Pipeline:
+    """pipeline_local.yml with the stub embedder, the local stores in store_dir and the OpenAI stub."""
+    with open("pipeline_local.yml", "r") as f:
+        data = yaml.safe_load(f)
+    components = data["components"]
+    components["text_embedder"] = {"type": f"{HashTextEmbedder.__module__}.{HashTextEmbedder.__name__}",
+                                   "init_parameters": {"dimension": 384, "latency": args.embed_latency}}
+    for name in ("retriever_docs_wire", "retriever_gh"):
+        components[name]["init_parameters"]["document_store"]["init_parameters"]["path"] = store_dir
+    components["generator"]["init_parameters"]["api_base_url"] = f"{openai_url}/v1"
+    os.environ["OPENAI_API_KEY"] = "stub"
+    return Pipeline.from_dict(data)
+
+
+def populate_stores(args, store_dir: str) -> None:
+    rng = np.random.default_rng(0)
+    for namespace in ("docs-wire", "github-wireapp"):
+        vectors = rng.normal(size=(args.documents, 384)).astype(np.float32)
+        documents = [Document(content=" ".join(rng.choice(WORDS, size=150)), embedding=vector.tolist(),
+                              meta={"url": f"https://example.com/{namespace}/{i // 4}", "split_id": i % 4,
+                                    "title": f"Document {i // 4}", "headline": "", "date": "2024-01-01"})
+                     for i, vector in enumerate(vectors)]
+        LocalDocumentStore(path=store_dir, namespace=namespace, dimension=384).write_documents(documents)
+
+
+async def run_load(pipeline: Pipeline, concurrency: int, questions: list[str]) -> dict:
+    """Runs the questions with concurrency clients asking one question after another."""
+    queue = asyncio.Queue()
+    for question in questions:
+        queue.put_nowait(question)
+    latencies = LatencyStats()
+
+    async def client():
+        while not queue.empty():
+            question = queue.get_nowait()
+            start = time.perf_counter()
+            await ask_question(question, pipeline)
+            latencies.add(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+    return {**latencies.report(), "questions_per_sec": len(questions) / seconds}
+
+
+def benchmark_query(args) -> dict:
+    base_url, stop = serve_in_thread(make_openai_app(token_delay=args.token_delay,
+                                                     first_token_delay=args.first_token_delay))
+    try:
+        with tempfile.TemporaryDirectory() as store_dir:
+            populate_stores(args, store_dir)
+            pipeline = build_query_pipeline(args, store_dir, base_url)
+            pipeline.warm_up()
+            rng = np.random.default_rng(1)
+            results = {}
+            for concurrency in args.concurrency:
+                questions = [f"How does {' '.join(rng.choice(WORDS, size=4))} work?" for _ in range(args.questions)]
+                results[str(concurrency)] = asyncio.run(run_load(pipeline, concurrency, questions))
+                print(f"ask_question, {concurrency} concurrent clients: {results[str(concurrency)]}")
+    finally:
+        stop()
+    return {"documents_per_namespace": args.documents, "concurrency": results}
+
+
+def git_version() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="*", choices=["crawl", "github", "query"], help="benchmarks to run")
+    parser.add_argument("--output", help="path of the JSON results")
+    parser.add_argument("--site-depth", type=int, default=3)
+    parser.add_argument("--site-branching", type=int, default=5)
+    parser.add_argument("--repos", type=int, default=4)
+    parser.add_argument("--files-per-repo", type=int, default=10)
+    parser.add_argument("--rate-limit", type=int, default=5000, help="API requests per window of the fake GitHub")
+    parser.add_argument("--rate-limit-window", type=int, default=60, help="seconds")
+    parser.add_argument("--api-latency", type=float, default=0.005, help="seconds added to every GitHub response")
+    parser.add_argument("--github-rps", type=float, default=50, help="requests per second of the RateLimiter")
+    parser.add_argument("--documents", type=int, default=10000, help="documents per namespace of the local store")
+    parser.add_argument("--embed-latency", type=float, default=0.01, help="seconds per question embedding")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between generated tokens")
+    parser.add_argument("--first-token-delay", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--questions", type=int, default=32, help="questions per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    benchmarks = {"crawl": benchmark_crawl, "github": benchmark_github, "query": benchmark_query}
+    results = {}
+    for name in args.only or benchmarks:
+        print(f"Running {name} benchmark")
+        results[name] = benchmarks[name](args)
+        print(json.dumps(results[name], indent=2))
+
+    version = git_version()
+    output = args.output or f"benchmarks/results/{version}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "time": time.time(), "python": platform.python_version(),
+                   "config": vars(args), "results": results}, f, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 from haystack import Pipeline
 from haystack.core.serialization import DeserializationCallbacks
+from utils.question_answering import stream_question
+from utils.answer_cache import AnswerCache, pipeline_document_stores
+from utils.serving import warm_up_pipeline
+from utils.metrics import PipelineTrace, RequestLog, start_metrics_server
+from contextlib import aclosing
 from typing import Type, Dict, Any
 import gradio as gr
 import os
+import time
 
 def component_pre_init_callback(component_name: str, component_cls: Type, init_params: Dict[str, Any]):
     # This function gets called every time a component is deserialized.
@@ -12,8 +18,6 @@ def component_pre_init_callback(component_name: str, component_cls: Type, init_p
         # the init method of the component during deserialization.
         init_params["remove_empty_lines"] = False
         print("Modified 'remove_empty_lines' to False in 'cleaner' component")
-    else:
-        print(f"Not modifying component {component_name} of class {component_cls}")
 
 
 # Load the pipeline from the YAML file
@@ -23,20 +27,25 @@ def load_pipeline_from_yaml(yaml_file_path):
     return Pipeline.loads(pipeline_yaml, callbacks=DeserializationCallbacks(component_pre_init_callback))
 
 
-# Function to interact with the pipeline
-def ask_question(question, pipeline):
-    if question == "" or question is None:
-        return ""
-    answer = pipeline.run({
-        "text_embedder": {"text": question},
-        "prompt_builder": {"question": question},
-        "answer_builder": {"query": question}
-    })
-    return answer['answer_builder']['answers'][0].data
+# Per-request records of the pipeline runs, metrics are served for Prometheus at METRICS_PORT
+request_log = RequestLog(os.getenv("REQUEST_LOG", "./logs/requests.jsonl"))
 
 
-# Load the pipeline (modify path if necessary)
-my_pipeline = load_pipeline_from_yaml('./pipeline.yml')
+# Latest question of each session, answers to older questions stop streaming
+latest_questions = {}
+
+
+# Load the pipeline (modify path or set PIPELINE_YAML, e.g. ./pipeline_local.yml for the offline document store)
+startup_start = time.perf_counter()
+my_pipeline = load_pipeline_from_yaml(os.getenv("PIPELINE_YAML", "./pipeline.yml"))
+
+# Load and warm up all components before accepting questions (EMBEDDER_QUANTIZATION=int8 for the int8 query embedder)
+startup_report = warm_up_pipeline(my_pipeline, quantization=os.getenv("EMBEDDER_QUANTIZATION") or None)
+print(f"Pipeline ready in {time.perf_counter() - startup_start:.1f} s: {startup_report}")
+start_metrics_server(int(os.getenv("METRICS_PORT", "8000")))
+
+# Answers to repeated and similar questions, cleared whenever the version of the index read by the retrievers changes
+answer_cache = AnswerCache(document_stores=pipeline_document_stores(my_pipeline))
 
 # Set up Gradio interface with Blocks layout
 with gr.Blocks() as interface:
@@ -48,11 +57,35 @@ with gr.Blocks() as interface:
     submit_btn = gr.Button("Submit")  # Submit button
     output_box = gr.Markdown(label="Answer:")  # Output field
 
-    # Set the click function for the button
-    submit_btn.click(fn=lambda question: ask_question(question, my_pipeline), inputs=input_box, outputs=output_box)
+    async def answer_question(question, request: gr.Request):
+        question_id = object()
+        latest_questions[request.session_hash] = question_id
+        trace = PipelineTrace(question, request.session_hash)
+        status = "cancelled"
+        try:
+            # Closing the stream aborts generation of an answer nobody waits for anymore
+            async with aclosing(stream_question(question, my_pipeline, answer_cache, trace)) as answers:
+                async for answer in answers:
+                    if latest_questions.get(request.session_hash) is not question_id:
+                        status = "superseded"
+                        return
+                    yield answer
+            status = "answered"
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            request_log.write(trace.finish(status))
+            if latest_questions.get(request.session_hash) is question_id:
+                del latest_questions[request.session_hash]
+
+    # Set the click function for the button, a new question may be asked while the previous answer streams
+    submit_btn.click(fn=answer_question, inputs=input_box, outputs=output_box,
+                     trigger_mode="multiple", concurrency_limit=None)
 
     # Set the enter key behavior for the input box
-    input_box.submit(fn=lambda question: ask_question(question, my_pipeline), inputs=input_box, outputs=output_box)
+    input_box.submit(fn=answer_question, inputs=input_box, outputs=output_box,
+                     trigger_mode="multiple", concurrency_limit=None)
 
 # Launch the Gradio app with sharing and authentication
 interface.launch(share=False, auth=("user", os.getenv("GRADIO_KEY")))
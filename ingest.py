@@ -0,0 +1,97 @@
+"""
+Streaming ingestion of docs.wire.com and the GitHub Markdown files into a document store.
+Scraping, splitting, embedding and writing run concurrently, progress is checkpointed,
+so an interrupted run continues where it stopped when started again with the same arguments.
+Chunks are tracked in the same manifest as IncrementalIndexer (./index_manifest/<namespace>.json): unchanged chunks
+are not written again and, once a run completes, chunks of changed or removed items are deleted.
+
+Examples:
+    dotenv run python ingest.py docs --entry-url https://docs.wire.com --depth 2 --namespace docs-wire
+    dotenv run python ingest.py github --org wireapp --namespace github-wireapp
+    python ingest.py docs --store local --namespace docs-wire
+"""
+import argparse
+import asyncio
+import os
+from utils.chunking import StructureAwareSplitter
+from utils.embedding_cache import CachedDocumentEmbedder
+from utils.http_cache import HttpCache
+from utils.indexing import IndexManifest
+from utils.ingestion import Checkpoint, ingest
+
+
+def embedding_dimension(embedder) -> int:
+    """Returns dimension of the embeddings of the SentenceTransformers embedder (loads the model)."""
+    embedder.warm_up()
+    return embedder.embedding_backend.model.get_sentence_embedding_dimension()
+
+
+def make_document_store(args, dimension: int):
+    if args.store == "local":
+        from utils.local_document_store import LocalDocumentStore
+        # Saved every --save-every chunks instead of rewriting the files after every batch
+        return LocalDocumentStore(path=args.local_path, namespace=args.namespace, dimension=dimension,
+                                  autosave=False)
+    from haystack_integrations.document_stores.pinecone import PineconeDocumentStore
+    return PineconeDocumentStore(index="wire-rag", namespace=args.namespace, dimension=dimension, metric="cosine",
+                                 spec={"serverless": {"region": "us-east-1", "cloud": "aws"}})
+
+
+def make_items(args, checkpoint: Checkpoint, cache: HttpCache | None):
+    if args.source == "docs":
+        from utils.url_scraper import crawl_and_extract, DATE_FORMATS, DATE_PATTERNS
+        list_data = {"white_list": args.white_list or [args.entry_url], "black_list": args.black_list or []}
+        return crawl_and_extract(args.entry_url, args.depth, DATE_FORMATS, DATE_PATTERNS, list_data, cache=cache)
+    from utils.github_scraper import iter_md_files
+    # Files already ingested are not downloaded again
+    return iter_md_files(args.org, os.getenv("GITHUB_API_TOKEN"), args.repo_limit, cache=cache,
+                         skip=lambda url: url in checkpoint)
+
+
+async def main(args):
+    checkpoint_path = args.checkpoint or f"./ingest_checkpoint/{args.namespace}.jsonl"
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = Checkpoint(checkpoint_path)
+    cache = HttpCache(args.http_cache) if args.http_cache else None
+    print(f"Resuming after {len(checkpoint.done)} ingested items" if checkpoint.done else "Starting ingestion")
+
+    from haystack.components.embedders import SentenceTransformersDocumentEmbedder
+    splitter = StructureAwareSplitter(model=args.model, max_tokens=256)
+    model_embedder = SentenceTransformersDocumentEmbedder(model=args.model, progress_bar=False)
+    document_store = make_document_store(args, embedding_dimension(model_embedder))
+    embedder = CachedDocumentEmbedder(model_embedder)
+    manifest = IndexManifest(args.manifest or f"./index_manifest/{args.namespace}.json")
+    try:
+        stats = await ingest(make_items(args, checkpoint, cache), splitter, embedder, document_store, checkpoint,
+                             manifest, queue_size=args.queue_size, batch_size=args.batch_size,
+                             save_every=args.save_every if args.store == "local" else None)
+    finally:
+        checkpoint.close()
+        if cache is not None:
+            cache.close()
+    print(f"Done: {stats}, embedding cache hits: {embedder.hits}, misses: {embedder.misses}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", choices=["docs", "github"])
+    parser.add_argument("--namespace", required=True, help="namespace of the document store, e.g. docs-wire")
+    parser.add_argument("--entry-url", default="https://docs.wire.com")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--white-list", nargs="*", help="allowed url prefixes (default: the entry url)")
+    parser.add_argument("--black-list", nargs="*", help="blocked url prefixes")
+    parser.add_argument("--org", default="wireapp")
+    parser.add_argument("--repo-limit", type=int)
+    parser.add_argument("--store", choices=["pinecone", "local"], default="pinecone")
+    parser.add_argument("--local-path", default="./local_store")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--checkpoint", help="default: ./ingest_checkpoint/<namespace>.jsonl")
+    parser.add_argument("--manifest", help="default: ./index_manifest/<namespace>.json (shared with the notebook)")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore the checkpoint of an interrupted run and ingest everything again")
+    parser.add_argument("--http-cache", default="./http_cache", help="empty string disables the cache")
+    parser.add_argument("--queue-size", type=int, default=64, help="capacity of every queue between the stages")
+    parser.add_argument("--batch-size", type=int, default=32, help="chunks embedded and written at once")
+    parser.add_argument("--save-every", type=int, default=20000, help="chunks written between saves of the local store")
+    asyncio.run(main(parser.parse_args()))
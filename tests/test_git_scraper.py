@@ -0,0 +1,61 @@
+"""
+Offline test of utils.git_scraper against a fixture repository built in a temporary directory.
+Run from the repository root: python -m pytest tests
+"""
+import asyncio
+import os
+import subprocess
+from utils.git_scraper import scrape_local_repo, sync_mirror
+
+
+def git(work_tree: str, *args: str, date: str | None = None) -> None:
+    env = {**os.environ, "GIT_AUTHOR_NAME": "Test", "GIT_AUTHOR_EMAIL": "test@example.com",
+           "GIT_COMMITTER_NAME": "Test", "GIT_COMMITTER_EMAIL": "test@example.com"}
+    if date:
+        env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = date
+    subprocess.run(["git", "-C", work_tree, *args], check=True, capture_output=True, env=env)
+
+
+def commit_files(work_tree: str, files: dict[str, str], date: str) -> None:
+    for path, content in files.items():
+        os.makedirs(os.path.dirname(os.path.join(work_tree, path)), exist_ok=True)
+        with open(os.path.join(work_tree, path), "w", encoding="utf-8") as f:
+            f.write(content)
+    git(work_tree, "add", "-A")
+    git(work_tree, "commit", "-q", "-m", f"Update {', '.join(files)}", date=date)
+
+
+def make_fixture_repo(tmp_path) -> str:
+    """Returns path of a bare mirror of a repository with .md files changed at known dates."""
+    work_tree = str(tmp_path / "work")
+    os.makedirs(work_tree)
+    git(work_tree, "init", "-q", "-b", "main")
+    # 01:30 at UTC+05:00 is the previous day in UTC
+    commit_files(work_tree, {"README.md": "# Readme v1\n", "docs/setup guide ü.md": "# Setup\n",
+                             ".github/ISSUE_TEMPLATE.md": "# Issue\n", "src/main.py": "print()\n"},
+                 date="2023-01-02T01:30:00+05:00")
+    commit_files(work_tree, {"README.md": "# Readme v2\n", "docs/.github/notes.md": "# Notes\n"},
+                 date="2024-03-04T12:00:00+00:00")
+
+    mirror_path = str(tmp_path / "mirrors" / "wireapp" / "fixture.git")
+    asyncio.run(sync_mirror(work_tree, mirror_path))
+    return mirror_path
+
+
+def test_scrape_local_repo(tmp_path):
+    mirror_path = make_fixture_repo(tmp_path)
+    records = asyncio.run(scrape_local_repo("wireapp/fixture", mirror_path))
+    by_title = {record["metadata"]["title"]: record for record in records}
+
+    # .github directories and files other than .md are excluded
+    assert sorted(by_title) == ["fixture/README.md", "fixture/docs/setup guide ü.md"]
+
+    readme = by_title["fixture/README.md"]
+    assert readme["content"] == "# Readme v2\n"
+    assert readme["metadata"] == {"url": "https://github.com/wireapp/fixture/blob/main/README.md",
+                                  "title": "fixture/README.md", "headline": "", "date": "2024-03-04"}
+
+    guide = by_title["fixture/docs/setup guide ü.md"]
+    assert guide["content"] == "# Setup\n"
+    assert guide["metadata"]["url"] == "https://github.com/wireapp/fixture/blob/main/docs/setup%20guide%20%C3%BC.md"
+    assert guide["metadata"]["date"] == "2023-01-01"
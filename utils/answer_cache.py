@@ -0,0 +1,149 @@
+import re
+import time
+from collections import OrderedDict
+import numpy as np
+from utils.local_document_store import LocalDocumentStore
+
+
+def normalize_question(question: str) -> str:
+    """Returns question lowercased, with single spaces and without trailing punctuation."""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?!. ").lower()
+
+
+def pipeline_document_stores(pipeline) -> list:
+    """Returns document stores of the pipeline's retrievers."""
+    stores = []
+    for name in pipeline.graph.nodes:
+        store = getattr(pipeline.get_component(name), "document_store", None)
+        if store is not None and all(store is not other for other in stores):
+            stores.append(store)
+    return stores
+
+
+def index_version(document_stores: list) -> tuple | None:
+    """
+    Returns version of the index the pipeline reads, None if it couldn't be read:
+    the saved version of every LocalDocumentStore (a newer version saved by another process is loaded)
+    and the number of vectors of every other store's namespace (Pinecone describe_index_stats).
+    """
+    version = []
+    for store in document_stores:
+        try:
+            if isinstance(store, LocalDocumentStore):
+                version.append((store.namespace, store.current_version()))
+            else:
+                version.append((getattr(store, "namespace", None), store.count_documents()))
+        except Exception as e:
+            print(f"Couldn't read version of the index: {e}")
+            return None
+    return tuple(version)
+
+
+class AnswerCache:
+    """
+    Two-level cache of generated answers.
+    The first level is an exact match of the normalized question, the second one finds an answer to a similar
+    question by cosine similarity of the question embeddings (the text_embedder output).
+    Entries expire after ttl seconds, least recently used ones are evicted above max_size
+    and the whole cache is cleared when the version of the index read by the pipeline changes.
+    """
+
+    def __init__(self, max_size=1000, ttl=24 * 60 * 60, similarity_threshold=0.93, document_stores=None,
+                 check_interval=30):
+        """
+        max_size - maximum number of cached answers
+        ttl - seconds after which an answer expires
+        similarity_threshold - minimum cosine similarity of questions sharing an answer, None disables the second level
+        document_stores - stores read by the pipeline (pipeline_document_stores), their index_version is checked
+        check_interval - minimum seconds between checks of the index version (a Pinecone check is a request)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.document_stores = document_stores or []
+        self.check_interval = check_interval
+        self.version = None
+        self.last_check = 0.0
+
+        # {normalized question: (answer, normalized embedding, time of creation)}
+        self.entries = OrderedDict()
+        self.matrix = None
+        self.matrix_keys = []
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.matrix = None
+        self.matrix_keys = []
+
+    def check_index(self) -> None:
+        """Clears the cache if the index changed since the answers were cached (checked every check_interval)."""
+        if not self.document_stores or time.monotonic() - self.last_check < self.check_interval:
+            return
+        self.last_check = time.monotonic()
+        version = index_version(self.document_stores)
+        if version is None:
+            return
+        if self.version is not None and version != self.version:
+            self.clear()
+        self.version = version
+
+    def remove_expired(self) -> None:
+        now = time.time()
+        expired = [key for key, (_, _, created) in self.entries.items() if now - created > self.ttl]
+        for key in expired:
+            del self.entries[key]
+        if expired:
+            self.matrix = None
+
+    def get(self, question: str) -> str | None:
+        """Returns cached answer to the same question or None, check_index is left to the caller (it may block)."""
+        self.remove_expired()
+        key = normalize_question(question)
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        self.exact_hits += 1
+        return self.entries[key][0]
+
+    def get_similar(self, embedding: list[float]) -> str | None:
+        """Returns cached answer to the most similar question above the threshold or None (counted as a miss)."""
+        if self.similarity_threshold is None or not self.entries:
+            self.misses += 1
+            return None
+        if self.matrix is None:
+            self.matrix_keys = list(self.entries)
+            self.matrix = np.stack([self.entries[key][1] for key in self.matrix_keys])
+
+        scores = self.matrix @ self.normalize(embedding)
+        best = int(np.argmax(scores))
+        key = self.matrix_keys[best]
+        if scores[best] < self.similarity_threshold or key not in self.entries:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.semantic_hits += 1
+        return self.entries[key][0]
+
+    def put(self, question: str, embedding: list[float], answer: str) -> None:
+        key = normalize_question(question)
+        self.entries[key] = (answer, self.normalize(embedding), time.time())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        self.matrix = None
+
+    @staticmethod
+    def normalize(embedding: list[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1)
+
+    def report(self) -> dict:
+        return {"size": len(self.entries), "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits, "misses": self.misses}
@@ -0,0 +1,209 @@
+import re
+from bisect import bisect_left, bisect_right
+from haystack import Document, component
+
+FENCE_PATTERN = re.compile(r"^\s*(```|~~~)")
+HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_blocks(text: str) -> list[tuple[str, str]]:
+    """
+    Splits Markdown text into blocks (kind, text), kind is "heading", "code" (a whole fenced block) or "text"
+    (a paragraph, lines separated by a blank line).
+    """
+    blocks = []
+    paragraph = []
+    lines = text.split("\n")
+    i = 0
+
+    def end_paragraph():
+        if paragraph:
+            blocks.append(("text", "\n".join(paragraph)))
+            paragraph.clear()
+
+    while i < len(lines):
+        line = lines[i]
+        fence = FENCE_PATTERN.match(line)
+        if fence:
+            end_paragraph()
+            # The block ends with the same fence, an unclosed one runs to the end of the text
+            end = next((j for j in range(i + 1, len(lines)) if lines[j].strip().startswith(fence.group(1))),
+                       len(lines) - 1)
+            blocks.append(("code", "\n".join(lines[i:end + 1])))
+            i = end + 1
+            continue
+        if HEADING_PATTERN.match(line):
+            end_paragraph()
+            blocks.append(("heading", line))
+        elif line.strip():
+            paragraph.append(line)
+        else:
+            end_paragraph()
+        i += 1
+    end_paragraph()
+    return blocks
+
+
+def split_sections(blocks: list[tuple[str, str]]) -> list[list[tuple[str, str]]]:
+    """Groups blocks into sections, each starting with a heading (except the text before the first one)."""
+    sections = []
+    for block in blocks:
+        if block[0] == "heading" or not sections:
+            sections.append([])
+        sections[-1].append(block)
+    return sections
+
+
+@component
+class StructureAwareSplitter:
+    """
+    Splits Markdown documents (GitHub files and docs.wire.com sections) into chunks that fit the embedding model,
+    counting tokens with the model's own tokenizer.
+    Whole sections (from a heading to the next one) are packed together while they fit, only a section longer than
+    the limit is split - between paragraphs, then lines, sentences and words - with an overlap between its chunks.
+    Fenced code blocks are never split.
+    """
+
+    def __init__(self, model="sentence-transformers/all-MiniLM-L6-v2", max_tokens=256, overlap_tokens=32):
+        """
+        model - embedding model whose tokenizer counts the tokens
+        max_tokens - input limit of the model (max_seq_length), including special tokens
+        overlap_tokens - maximum number of tokens repeated between chunks of a split section
+        """
+        self.model = model
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.tokenizer = None
+
+    def warm_up(self):
+        if self.tokenizer is None:
+            from transformers import AutoTokenizer
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model)
+
+    @property
+    def budget(self) -> int:
+        """Tokens left for the text after the special tokens ([CLS], [SEP]) the model adds."""
+        return self.max_tokens - self.tokenizer.num_special_tokens_to_add()
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def token_offsets(self, text: str) -> list[tuple[int, int]]:
+        return self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+
+    def split_words(self, text: str) -> list[str]:
+        """Splits text into pieces of at most budget - overlap_tokens tokens at word boundaries."""
+        offsets = self.token_offsets(text)
+        # Tokens preceded by whitespace start a word
+        word_starts = [i for i in range(1, len(offsets)) if offsets[i][0] > offsets[i - 1][1]]
+        pieces = []
+        start = 0
+        # Leaves room for the overlap with the previous piece
+        window = max(self.budget - self.overlap_tokens, 1)
+        while start < len(offsets):
+            end = start + window
+            if end < len(offsets):
+                # Ends before the last word starting within the budget, unless one word is longer than the budget
+                starts = word_starts[bisect_left(word_starts, start + 1):bisect_right(word_starts, end)]
+                end = starts[-1] if starts else end
+            else:
+                end = len(offsets)
+            piece_end = offsets[end][0] if end < len(offsets) else len(text)
+            pieces.append(text[offsets[start][0]:piece_end].strip())
+            start = end
+        return [piece for piece in pieces if piece]
+
+    def split_text(self, text: str) -> list[str]:
+        """Splits a paragraph longer than the budget into lines, sentences and finally words."""
+        if self.count_tokens(text) <= self.budget:
+            return [text]
+        for pattern in ("\n", SENTENCE_END_PATTERN):
+            parts = text.split(pattern) if isinstance(pattern, str) else pattern.split(text)
+            parts = [part for part in parts if part.strip()]
+            if len(parts) > 1:
+                return [piece for part in parts for piece in self.split_text(part)]
+        return self.split_words(text)
+
+    def overlap(self, text: str) -> str:
+        """Returns end of the text with at most overlap_tokens tokens, starting at a word boundary."""
+        offsets = self.token_offsets(text)
+        if self.overlap_tokens <= 0 or not offsets:
+            return ""
+        if len(offsets) <= self.overlap_tokens:
+            return text
+        start = offsets[-self.overlap_tokens][0]
+        if start > 0 and not text[start - 1].isspace():
+            next_space = re.search(r"\s", text[start:])
+            if next_space is None:
+                return ""
+            start += next_space.end()
+        return text[start:].strip()
+
+    def split_section(self, blocks: list[tuple[str, str]]) -> list[str]:
+        """Splits section longer than the budget into chunks, consecutive chunks share an overlap of text."""
+        pieces = []
+        for kind, text in blocks:
+            if kind == "code":
+                pieces.append((kind, text, self.count_tokens(text)))
+            else:
+                pieces.extend((kind, piece, self.count_tokens(piece)) for piece in self.split_text(text))
+
+        chunks = []
+        current = []
+        current_tokens = 0
+        for kind, text, tokens in pieces:
+            if current and current_tokens + tokens > self.budget:
+                # A heading goes to the chunk with the text under it
+                carried = ([current.pop()] if current[-1][0] == "heading" and current[-1][2] + tokens <= self.budget
+                           else [])
+                if current:
+                    chunks.append("\n".join(text for _, text, _ in current))
+                last_kind, last_text, _ = current[-1] if current else ("heading", "", 0)
+                current = carried
+                current_tokens = sum(tokens for _, _, tokens in current)
+                if not carried and last_kind == "text" and kind == "text":
+                    overlap = self.overlap(last_text)
+                    overlap_tokens = self.count_tokens(overlap) if overlap else 0
+                    if overlap and overlap_tokens + tokens <= self.budget:
+                        current, current_tokens = [("text", overlap, overlap_tokens)], overlap_tokens
+            current.append((kind, text, tokens))
+            current_tokens += tokens
+        if current:
+            chunks.append("\n".join(text for _, text, _ in current))
+        return chunks
+
+    def split_document(self, text: str) -> list[str]:
+        chunks = []
+        current = []
+        current_tokens = 0
+        for section in split_sections(split_blocks(text)):
+            section_text = "\n".join(block for _, block in section)
+            section_tokens = self.count_tokens(section_text)
+            if section_tokens > self.budget:
+                if current:
+                    chunks.append("\n\n".join(current))
+                    current, current_tokens = [], 0
+                chunks.extend(self.split_section(section))
+                continue
+            # Sections are joined with a blank line, which is no token
+            if current and current_tokens + section_tokens > self.budget:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(section_text)
+            current_tokens += section_tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
+
+    @component.output_types(documents=list[Document])
+    def run(self, documents: list[Document]):
+        self.warm_up()
+        split_documents = []
+        for document in documents:
+            if not document.content:
+                continue
+            for split_id, chunk in enumerate(self.split_document(document.content)):
+                split_documents.append(Document(content=chunk,
+                                                meta={**document.meta, "source_id": document.id, "split_id": split_id}))
+        return {"documents": split_documents}
@@ -0,0 +1,158 @@
+import re
+from dataclasses import replace
+from typing import Any
+import tiktoken
+from haystack import Document, component
+from utils.indexing import chunk_source
+
+
+def make_token_counter(model: str):
+    """
+    Returns function counting tokens of a text for the model with its tiktoken encoding.
+    If the encoding can't be loaded (it's downloaded on first use) the count is estimated
+    as the number of words and punctuation marks.
+    """
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"Couldn't load tiktoken encoding ({e}), token counts are estimated")
+        return lambda text: len(re.findall(r"\w+|[^\w\s]", text))
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def shingles(text: str, size: int) -> set[int]:
+    """Returns hashes of all sequences of size words in the text (lowercased, punctuation ignored)."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return {hash(tuple(words))} if words else set()
+    return {hash(tuple(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+def containment(a: set[int], b: set[int]) -> float:
+    """Returns share of the smaller set contained in the other one (1.0 if one text is a part of the other)."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def merge_overlapping(first: str, second: str, max_overlap: int) -> str:
+    """Joins texts of consecutive chunks, writing the words repeated by the splitter overlap only once."""
+    first_words = first.rstrip().split(" ")
+    second_words = second.strip().split(" ")
+    for overlap in range(min(max_overlap, len(first_words), len(second_words)), 0, -1):
+        if first_words[-overlap:] == second_words[:overlap]:
+            return " ".join(first_words + second_words[overlap:])
+    return " ".join(first_words) + "\n" + " ".join(second_words)
+
+
+@component
+class ContextPacker:
+    """
+    Packs retrieved documents into the prompt context:
+    drops near-duplicate chunks (e.g. content mirrored between GitHub and docs.wire.com),
+    merges consecutive chunks of the same source into one document without the splitter overlap
+    and fills the token budget with documents in score order.
+    meta output is meant for AnswerBuilder.meta, so the saved tokens end up in the answer metadata.
+    """
+
+    def __init__(self, token_budget=8000, similarity_threshold=0.8, shingle_size=5, max_overlap=50,
+                 model="gpt-4o-mini"):
+        """
+        token_budget - maximum number of tokens of the packed documents
+        similarity_threshold - share of shingles of the smaller chunk found in a better scored one to drop it
+        shingle_size - number of words in a shingle
+        max_overlap - maximum number of words repeated between consecutive chunks (split_overlap of the splitter)
+        model - model whose tokenizer counts the tokens
+        """
+        self.token_budget = token_budget
+        self.similarity_threshold = similarity_threshold
+        self.shingle_size = shingle_size
+        self.max_overlap = max_overlap
+        self.model = model
+        self.count_tokens = None
+
+    def warm_up(self):
+        if self.count_tokens is None:
+            self.count_tokens = make_token_counter(self.model)
+
+    def document_tokens(self, document: Document) -> int:
+        """Returns tokens the document takes in the prompt (content, title, headline and date)."""
+        meta = " ".join(str(document.meta.get(key, "")) for key in ("date", "title", "headline"))
+        return self.count_tokens(meta + "\n" + (document.content or ""))
+
+    def remove_duplicates(self, documents: list[Document]) -> list[Document]:
+        """Keeps documents (in score order) not covered by an already kept one."""
+        kept = []
+        kept_shingles = []
+        for document in documents:
+            document_shingles = shingles(document.content or "", self.shingle_size)
+            if any(containment(document_shingles, other) >= self.similarity_threshold for other in kept_shingles):
+                continue
+            kept.append(document)
+            kept_shingles.append(document_shingles)
+        return kept
+
+    def merge_adjacent(self, documents: list[Document]) -> list[Document]:
+        """
+        Merges chunks of the same source document with consecutive split_id, the merged chunk takes the best score.
+        split_id is numbered per source document (source_id), a docs.wire.com page has one per headline,
+        so chunks are grouped by url only when source_id is missing.
+        """
+        groups = {}
+        for document in documents:
+            groups.setdefault(document.meta.get("source_id") or chunk_source(document), []).append(document)
+
+        merged = []
+        for source, group in groups.items():
+            if not source:
+                merged.extend(group)
+                continue
+            run = None
+            for document in sorted(group, key=lambda document: document.meta.get("split_id", -1)):
+                split_id = document.meta.get("split_id")
+                if split_id is None:
+                    merged.append(document)
+                elif run is not None and split_id == run.meta["split_id_end"] + 1:
+                    run = replace(run, content=merge_overlapping(run.content or "", document.content or "",
+                                                                 self.max_overlap),
+                                  score=max(run.score or 0, document.score or 0),
+                                  meta={**run.meta, "split_id_end": split_id})
+                else:
+                    if run is not None:
+                        merged.append(run)
+                    run = replace(document, meta={**document.meta, "split_id_end": split_id})
+            if run is not None:
+                merged.append(run)
+        return sorted(merged, key=lambda document: document.score or 0, reverse=True)
+
+    @component.output_types(documents=list[Document], meta=list[dict[str, Any]])
+    def run(self, documents: list[Document]):
+        self.warm_up()
+        input_tokens = sum(self.document_tokens(document) for document in documents)
+        documents = sorted(documents, key=lambda document: document.score or 0, reverse=True)
+
+        unique = self.remove_duplicates(documents)
+        merged = self.merge_adjacent(unique)
+
+        # Documents that don't fit are skipped, smaller ones with lower score may still fit
+        packed = []
+        context_tokens = 0
+        for document in merged:
+            tokens = self.document_tokens(document)
+            if context_tokens + tokens > self.token_budget:
+                continue
+            packed.append(document)
+            context_tokens += tokens
+
+        meta = {
+            "context_documents": len(packed),
+            "context_tokens": context_tokens,
+            "input_tokens_saved": input_tokens - context_tokens,
+            "duplicates_dropped": len(documents) - len(unique),
+            "chunks_merged": len(unique) - len(merged),
+            "over_budget_dropped": len(merged) - len(packed),
+        }
+        return {"documents": packed, "meta": [meta]}
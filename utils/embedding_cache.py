@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import re
+import numpy as np
+from haystack import Document, component
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of embeddings.
+    Vectors are appended to a float32 file read through a memory map (no deserialization on lookup),
+    keys are appended to a small text index where the line number is the row of the vector.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.vectors_path = os.path.join(cache_dir, "vectors.f32")
+        self.keys_path = os.path.join(cache_dir, "keys.txt")
+        self.meta_path = os.path.join(cache_dir, "meta.json")
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.dim = None
+        self.rows = {}
+        self.vectors = None
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+            keys = []
+            if os.path.exists(self.keys_path):
+                with open(self.keys_path, "r", encoding="utf-8") as f:
+                    keys = f.read().split()
+            # A vector written without its key (interrupted append) is ignored and overwritten
+            stored_bytes = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+            self.rows = {key: row for row, key in enumerate(keys[:stored_bytes // (self.dim * 4)])}
+        # Without meta.json the first append was interrupted, its vectors and keys are dropped
+        self.truncate()
+        self.map_vectors()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, key: str):
+        return key in self.rows
+
+    def truncate(self) -> None:
+        """Drops vectors and keys beyond the last complete entry."""
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(len(self.rows) * (self.dim or 0) * 4)
+        with open(self.keys_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{key}\n" for key in self.rows)
+
+    def map_vectors(self) -> None:
+        self.vectors = (np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(self.rows), self.dim))
+                        if self.rows else None)
+
+    def get(self, key: str) -> list[float]:
+        return self.vectors[self.rows[key]].tolist()
+
+    def add(self, items: dict[str, list[float]]) -> None:
+        """Appends {key: vector} to the cache."""
+        items = {key: vector for key, vector in items.items() if key not in self.rows}
+        if not items:
+            return
+        first = self.dim is None
+        if first:
+            self.dim = len(next(iter(items.values())))
+
+        vectors = np.asarray(list(items.values()), dtype=np.float32).reshape(len(items), self.dim)
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self.keys_path, "a", encoding="utf-8") as f:
+            f.writelines(f"{key}\n" for key in items)
+        if first:
+            # Written last, the files are only used once the first vectors and keys are complete
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim}, f)
+        for key in items:
+            self.rows[key] = len(self.rows)
+        self.map_vectors()
+
+
+@component
+class CachedDocumentEmbedder:
+    """
+    Wraps a document embedder (e.g. SentenceTransformersDocumentEmbedder) with a persistent EmbeddingCache.
+    Documents are keyed on hash(model, normalized text the embedder would embed),
+    only cache misses are sent to the model, which is loaded only when the first miss comes.
+    Each model (with its embedding settings) has its own subdirectory of cache_dir, as vectors of a cache have one
+    dimension.
+    """
+
+    def __init__(self, embedder, cache_dir="./embedding_cache"):
+        """
+        embedder - document embedder to wrap
+        cache_dir - directory of the cache, can be shared by embedders of different models (one subdirectory each)
+        """
+        self.embedder = embedder
+        self.cache_dir = cache_dir
+        self.cache = None
+        self.embedder_warmed_up = False
+        self.hits = 0
+        self.misses = 0
+
+    def warm_up(self):
+        if self.cache is None:
+            model_hash = hashlib.sha256(json.dumps(self.model_settings()).encode()).hexdigest()[:16]
+            self.cache = EmbeddingCache(os.path.join(self.cache_dir, model_hash))
+
+    def model_settings(self) -> list:
+        """Returns the model and the settings of the wrapped embedder that change the embeddings."""
+        return [getattr(self.embedder, "model", type(self.embedder).__name__),
+                getattr(self.embedder, "normalize_embeddings", None),
+                getattr(self.embedder, "truncate_dim", None),
+                getattr(self.embedder, "precision", None)]
+
+    def text_to_embed(self, document: Document) -> str:
+        """Returns text the wrapped embedder would embed for the document."""
+        meta_fields = getattr(self.embedder, "meta_fields_to_embed", None) or []
+        separator = getattr(self.embedder, "embedding_separator", "\n")
+        meta_values = [str(document.meta[key]) for key in meta_fields if document.meta.get(key)]
+        return (getattr(self.embedder, "prefix", "") + separator.join(meta_values + [document.content or ""])
+                + getattr(self.embedder, "suffix", ""))
+
+    def cache_key(self, document: Document) -> str:
+        # Whitespace doesn't change the tokens, so it doesn't change the embedding
+        text = re.sub(r"\s+", " ", self.text_to_embed(document)).strip()
+        return hashlib.sha256(json.dumps([self.model_settings(), text]).encode()).hexdigest()
+
+    @component.output_types(documents=list[Document], meta=dict)
+    def run(self, documents: list[Document]):
+        self.warm_up()
+        keys = [self.cache_key(document) for document in documents]
+
+        # Same text is embedded once, even within a batch
+        misses = {}
+        for key, document in zip(keys, documents):
+            if key not in self.cache and key not in misses:
+                misses[key] = document
+
+        if misses:
+            if not self.embedder_warmed_up and hasattr(self.embedder, "warm_up"):
+                self.embedder.warm_up()
+                self.embedder_warmed_up = True
+            embedded = self.embedder.run(documents=list(misses.values()))["documents"]
+            self.cache.add({key: document.embedding for key, document in zip(misses, embedded)})
+
+        for key, document in zip(keys, documents):
+            document.embedding = self.cache.get(key)
+
+        hits = len(documents) - len(misses)
+        self.hits += hits
+        self.misses += len(misses)
+        return {"documents": documents, "meta": {"hits": hits, "misses": len(misses)}}
@@ -0,0 +1,190 @@
+import aiohttp
+import asyncio
+import base64
+import os
+from urllib.parse import quote
+from utils.github_scraper import fetch_repositories, is_md_path
+
+
+async def run_git(*args: str, git_dir: str | None = None, stdin: bytes | None = None,
+                  env: dict | None = None) -> bytes:
+    """
+    Runs git command and returns its stdout.
+    Raises RuntimeError if git exits with non-zero status.
+    """
+    command = ["git"] + (["--git-dir", git_dir] if git_dir else []) + list(args)
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env={**os.environ, **(env or {})}
+    )
+    stdout, stderr = await process.communicate(stdin)
+    if process.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed: {stderr.decode(errors='replace').strip()}")
+    return stdout
+
+
+def auth_env(api_key: str | None) -> dict:
+    """
+    Returns environment passing the token as an http header,
+    so it is never written to the mirror config or visible in the process list.
+    """
+    if not api_key:
+        return {}
+    credentials = base64.b64encode(f"x-access-token:{api_key}".encode()).decode()
+    return {
+        "GIT_CONFIG_COUNT": "1",
+        "GIT_CONFIG_KEY_0": "http.extraHeader",
+        "GIT_CONFIG_VALUE_0": f"Authorization: Basic {credentials}",
+        "GIT_TERMINAL_PROMPT": "0"
+    }
+
+
+async def sync_mirror(clone_url: str, mirror_path: str, api_key: str | None = None, depth=None) -> None:
+    """
+    Bare-clones the repository into mirror_path or fetches new commits if the mirror already exists.
+    depth - shallow clone depth, None for full history (needed for accurate last modified dates)
+    """
+    depth_args = [f"--depth={depth}"] if depth else []
+    if os.path.isdir(mirror_path):
+        await run_git("fetch", "--prune", *depth_args, clone_url, "+refs/heads/*:refs/heads/*",
+                      git_dir=mirror_path, env=auth_env(api_key))
+    else:
+        await run_git("clone", "--bare", "--quiet", *depth_args, clone_url, mirror_path, env=auth_env(api_key))
+
+
+async def list_md_blobs(git_dir: str, rev="HEAD") -> dict[str, str]:
+    """
+    Returns {path: blob_id} of all .md files outside of .github directories at the given revision.
+    """
+    output = await run_git("ls-tree", "-r", "-z", rev, git_dir=git_dir)
+    md_blobs = {}
+    for entry in output.decode(errors="replace").split("\0"):
+        if not entry:
+            continue
+        info, path = entry.split("\t", 1)
+        _, object_type, blob_id = info.split()
+        if object_type == "blob" and is_md_path(path):
+            md_blobs[path] = blob_id
+    return md_blobs
+
+
+async def read_blobs(git_dir: str, blob_ids: list[str]) -> dict[str, str]:
+    """
+    Reads blob contents straight from the object store with a single cat-file process.
+    Returns {blob_id: content}
+    """
+    if not blob_ids:
+        return {}
+    output = await run_git("cat-file", "--batch", git_dir=git_dir, stdin="\n".join(blob_ids).encode() + b"\n")
+    contents = {}
+    position = 0
+    for blob_id in blob_ids:
+        header_end = output.index(b"\n", position)
+        header = output[position:header_end].split()
+        if header[-1] == b"missing":
+            position = header_end + 1
+            continue
+        size = int(header[2])
+        contents[blob_id] = output[header_end + 1:header_end + 1 + size].decode(errors="replace")
+        position = header_end + 1 + size + 1  # Content is followed by '\n'
+    return contents
+
+
+async def fetch_last_modified_dates(git_dir: str, paths: list[str], rev="HEAD") -> dict[str, str]:
+    """
+    Returns {path: last commit date} in "%Y-%m-%d" format (UTC, like the GitHub API) from a single git log pass.
+    In a shallow clone files untouched since the oldest fetched commit get the date of that commit.
+    """
+    remaining = set(paths)
+    dates = dict.fromkeys(paths, "Unknown")
+    if not remaining:
+        return dates
+    output = await run_git("-c", "core.quotePath=false", "log", "--no-renames", "--name-only",
+                           "--format=%x01%cd", "--date=format-local:%Y-%m-%d", rev, "--", "*.md",
+                           git_dir=git_dir, env={"TZ": "UTC"})
+
+    # Log is newest first, so the first commit listing a file is its last modification
+    current_date = "Unknown"
+    for line in output.decode(errors="replace").splitlines():
+        if line.startswith("\x01"):
+            current_date = line[1:]
+        elif line in remaining:
+            dates[line] = current_date
+            remaining.discard(line)
+            if not remaining:
+                break
+    return dates
+
+
+async def scrape_local_repo(repo_full_name: str, git_dir: str, rev="HEAD") -> list[dict]:
+    """
+    Returns a list of dictionaries {content: string, metadata: dict} for .md files of a local repository,
+    in the same shape as github_scraper.scrape_md_files.
+    git_dir - path to a bare repository or to the .git directory of a working copy
+    """
+    branch = (await run_git("rev-parse", "--abbrev-ref", rev, git_dir=git_dir)).decode().strip()
+    md_blobs = await list_md_blobs(git_dir, rev)
+    contents = await read_blobs(git_dir, list(dict.fromkeys(md_blobs.values())))
+    dates = await fetch_last_modified_dates(git_dir, list(md_blobs), rev)
+
+    return [{
+        'content': contents.get(blob_id, ""),
+        'metadata': {
+            'url': f"https://github.com/{repo_full_name}/blob/{quote(branch)}/{quote(path)}",
+            'title': repo_full_name.split('/')[-1] + '/' + path,
+            'headline': '', # url_scraper document has this field
+            'date': dates[path]
+        }
+    } for path, blob_id in md_blobs.items()]
+
+
+async def scrape_local_repos(repo_dirs: dict[str, str], max_concurrent=4) -> list[dict]:
+    """
+    Scrapes .md files from already cloned repositories, no network access needed.
+    repo_dirs - dict{repo_full_name: git_dir}
+    """
+    semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def scrape(repo_full_name, git_dir):
+        async with semaphore:
+            try:
+                return await scrape_local_repo(repo_full_name, git_dir)
+            except RuntimeError as e:
+                print(f"Error reading {repo_full_name}: {e}")
+                return []
+
+    all_md_files = await asyncio.gather(*(scrape(name, path) for name, path in repo_dirs.items()))
+    return [md_file for repo_files in all_md_files for md_file in repo_files]
+
+
+async def scrape_md_files_from_mirrors(org_name: str, api_key: str, repo_limit=None,
+                                       mirror_dir="./mirrors", depth=None, max_concurrent=4) -> list[dict]:
+    """
+    Alternative backend of github_scraper.scrape_md_files with the same output.
+    Repositories are listed with the API, bare-cloned into mirror_dir (or updated if the mirror exists)
+    and read locally, so the only API calls are the repository listing pages.
+    depth - shallow clone depth, None for full history (needed for accurate last modified dates)
+    """
+    async with aiohttp.ClientSession() as session:
+        repos = await fetch_repositories(session, org_name, api_key, repo_limit)
+
+    semaphore = asyncio.Semaphore(max_concurrent)
+    repo_dirs = {}
+
+    async def mirror(repo):
+        mirror_path = os.path.join(mirror_dir, repo['full_name'] + ".git")
+        async with semaphore:
+            try:
+                await sync_mirror(repo['clone_url'], mirror_path, api_key, depth)
+                repo_dirs[repo['full_name']] = mirror_path
+            except RuntimeError as e:
+                print(f"Error mirroring {repo['full_name']}: {e}")
+
+    os.makedirs(mirror_dir, exist_ok=True)
+    await asyncio.gather(*(mirror(repo) for repo in repos))
+    # Keep the API order of repositories
+    return await scrape_local_repos({repo['full_name']: repo_dirs[repo['full_name']]
+                                     for repo in repos if repo['full_name'] in repo_dirs}, max_concurrent)
@@ -1,39 +1,207 @@
 import aiohttp
 import asyncio
+import os
 import time
+from contextlib import asynccontextmanager
 from datetime import datetime
+from urllib.parse import quote
+from utils.http_cache import HttpCache, CachedSession
 
+# Base URLs of the REST API and of raw file downloads, overridable to scrape a GitHub Enterprise or a local stand-in
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+GITHUB_RAW_URL = os.getenv("GITHUB_RAW_URL", "https://raw.githubusercontent.com")
 
-async def handle_rate_limit(headers) -> None:
+
+class RateLimiter:
     """
-    Handle GitHub API rate limit by checking the 'X-RateLimit-Reset' header.
-    If the rate limit is hit, this function will sleep until the rate limit resets.
+    Scheduler shared by all GitHub requests of a scrape.
+    Spaces requests with a token bucket, tracks 'X-RateLimit-Remaining' and 'X-RateLimit-Reset'
+    from every response and pauses all requests at once just before the limit is hit,
+    or for 'Retry-After' seconds when a secondary rate limit is hit.
     """
-    if 'X-RateLimit-Reset' in headers:
-        reset_time = int(headers['X-RateLimit-Reset'])
-        current_time = int(time.time())
-        sleep_duration = reset_time - current_time
-        if sleep_duration > 0:
-            print(f"Rate limit hit. Sleeping for {sleep_duration} seconds.")
-            await asyncio.sleep(sleep_duration)
-    else:
-        # Sleep for a fixed time in case of abuse detection
-        print(f"Sleeping for 60 seconds due to potential abuse detection.")
-        await asyncio.sleep(60)
+
+    def __init__(self, requests_per_second=10.0, burst=20, reserve=1, abuse_sleep=60):
+        """
+        requests_per_second - token bucket refill rate
+        burst - token bucket size
+        reserve - number of requests left in the budget at which all requests are paused until the reset
+        abuse_sleep - pause in seconds for secondary rate limit responses without 'Retry-After'
+        """
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.reserve = reserve
+        self.abuse_sleep = abuse_sleep
+
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+        self.limit = None
+        self.remaining = None
+        self.reset = None
+        self.probe_needed = True
+        self.probe = None
+        self.budget_windows = {}  # reset time -> [remaining before the first request, lowest remaining]
+        self.requests = 0
+        self.api_requests = 0
+        self.not_modified = 0
+        self.rate_limited = 0
+        self.pauses = 0
+        self.paused_seconds = 0.0
+
+    def pause(self, seconds: float, reason: str) -> None:
+        """Pauses all requests for the given number of seconds."""
+        until = time.time() + seconds
+        if until > self.paused_until:
+            print(f"{reason}. Pausing all requests for {int(seconds)} seconds.")
+            self.paused_until = until
+            self.pauses += 1
+            self.paused_seconds += seconds
+
+    async def acquire(self, api=True) -> bool:
+        """
+        Waits until the request may be sent without hitting the rate limit.
+        api - False for requests not counted against the API budget (raw.githubusercontent.com downloads)
+        Returns True if the request is the probe sent alone while the budget is unknown, its response must be
+        passed to release_probe.
+        """
+        while True:
+            async with self.lock:
+                now = time.time()
+                if self.reset is not None and now >= self.reset:
+                    # Budget was renewed, the next response will tell how much of it is left
+                    self.remaining = None
+                    self.reset = None
+                    self.probe_needed = True
+                if self.paused_until > now:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                if api and self.remaining is not None and self.remaining <= self.reserve and self.reset is not None:
+                    self.pause(self.reset - now + 1, f"Rate limit budget used ({self.remaining} left)")
+                    continue
+                probe = self.probe
+                if not (api and self.remaining is None and self.probe_needed and probe is not None):
+                    monotonic_now = time.monotonic()
+                    self.tokens = min(self.burst,
+                                      self.tokens + (monotonic_now - self.last_refill) * self.requests_per_second)
+                    self.last_refill = monotonic_now
+                    if self.tokens < 1:
+                        await asyncio.sleep((1 - self.tokens) / self.requests_per_second)
+                        continue
+
+                    self.tokens -= 1
+                    self.requests += 1
+                    if not api:
+                        return False
+                    if self.remaining is None and self.probe_needed:
+                        # Only one request is sent until its response tells how much of the budget is left
+                        self.probe = asyncio.Event()
+                        return True
+                    if self.remaining is not None:
+                        # Count requests in flight, headers only tell what was left when the response was sent
+                        self.remaining -= 1
+                    return False
+            # Waits for the probe response outside the lock, so requests to the raw host aren't blocked
+            await probe.wait()
+
+    def release_probe(self) -> None:
+        """Lets the requests waiting for the probe response go."""
+        # Without rate limit headers in the response the budget stays unknown, requests are no longer probed
+        self.probe_needed = False
+        self.probe.set()
+        self.probe = None
+
+    def update(self, headers) -> None:
+        """Updates rate limit budget from response headers."""
+        if 'X-RateLimit-Remaining' not in headers:
+            return
+        self.api_requests += 1
+        remaining = int(headers['X-RateLimit-Remaining'])
+        reset = int(headers.get('X-RateLimit-Reset', 0)) or None
+        self.limit = int(headers.get('X-RateLimit-Limit', 0)) or self.limit
+        window = self.budget_windows.setdefault(reset, [remaining + 1, remaining])
+        window[0] = max(window[0], remaining + 1)
+        window[1] = min(window[1], remaining)
+        if reset != self.reset or self.remaining is None:
+            self.reset = reset
+            self.remaining = remaining
+        else:
+            # Responses arrive out of order, the lowest value in the window is the most recent one
+            self.remaining = min(self.remaining, remaining)
+
+    def is_rate_limited(self, response: aiohttp.ClientResponse) -> bool:
+        """
+        Returns True if the request was rejected by a rate limit and should be retried.
+        All requests are paused until the limit resets.
+        """
+        if response.status not in (403, 429):
+            return False
+        headers = response.headers
+        if 'Retry-After' in headers:
+            self.pause(int(headers['Retry-After']), "Secondary rate limit hit")
+        elif headers.get('X-RateLimit-Remaining') == '0' and 'X-RateLimit-Reset' in headers:
+            self.pause(int(headers['X-RateLimit-Reset']) - time.time() + 1, "Rate limit hit")
+        elif response.status == 429 or 'X-RateLimit-Remaining' not in headers:
+            self.pause(self.abuse_sleep, "Potential abuse detection")
+        else:
+            # 403 with budget left is a permission error, not a rate limit
+            return False
+        self.rate_limited += 1
+        return True
+
+    @asynccontextmanager
+    async def get(self, session: aiohttp.ClientSession, url: str, api=True, **kwargs):
+        """
+        Scheduled replacement of session.get
+        api - False for requests not counted against the API budget (raw.githubusercontent.com downloads)
+        """
+        probe = await self.acquire(api)
+        try:
+            async with session.get(url, **kwargs) as response:
+                if api and getattr(response, 'from_cache', False):
+                    # Conditional requests answered with 304 don't count against the rate limit
+                    self.not_modified += 1
+                    if self.remaining is not None:
+                        self.remaining += 1
+                self.update(response.headers)
+                if probe:
+                    self.release_probe()
+                    probe = False
+                yield response
+        finally:
+            if probe:
+                self.release_probe()
+
+    def report(self) -> dict:
+        """Returns how many requests were sent and how much of the rate limit budget they used."""
+        return {
+            "requests": self.requests,
+            "api_requests": self.api_requests,
+            "not_modified": self.not_modified,
+            "rate_limited": self.rate_limited,
+            "budget_used": sum(start - lowest for start, lowest in self.budget_windows.values()),
+            "remaining": self.remaining,
+            "limit": self.limit,
+            "pauses": self.pauses,
+            "paused_seconds": round(self.paused_seconds, 1)
+        }
 
 
 async def fetch_repositories(session: aiohttp.ClientSession, org_name: str,
-                             api_key: str, repo_limit=None) -> list[dict]:
+                             api_key: str, repo_limit=None, rate_limiter: RateLimiter | None = None) -> list[dict]:
     """
     Returns a list of repositories in the given organization.
     Each repository is represented as a dictionary with repository metadata.
     If repo_limit is provided, only that number of repositories is fetched.
-    This function handles rate limiting and retry logic for 403 errors.
+    Requests go through the shared rate_limiter, which pauses and retries rate limited requests.
     """
+    if rate_limiter is None:
+        rate_limiter = RateLimiter()
     all_repos = []
     page = 1
 
-    url = f"https://api.github.com/orgs/{org_name}/repos"
+    url = f"{GITHUB_API_URL}/orgs/{org_name}/repos"
     headers = {
         "Authorization": f"token {api_key}",
         "Accept": "application/vnd.github.v3+json"
@@ -46,7 +214,7 @@ async def fetch_repositories(session: aiohttp.ClientSession, org_name: str,
         else:
             params = {"per_page": 100, "page": page}
 
-        async with session.get(url, headers=headers, params=params) as response:
+        async with rate_limiter.get(session, url, headers=headers, params=params) as response:
             if response.status == 200:
                 repos = await response.json()
                 if not repos:
@@ -58,9 +226,9 @@ async def fetch_repositories(session: aiohttp.ClientSession, org_name: str,
                     return all_repos[:repo_limit]  # Return only up to the repo_limit
 
                 page += 1  # Move to the next page for pagination
-            elif response.status == 403:
-                print(f"403 error for {org_name}. Checking for rate limits or abuse detection.")
-                await handle_rate_limit(response.headers)
+            elif rate_limiter.is_rate_limited(response):
+                # All requests are paused by the rate limiter, retry once it resumes
+                continue
             else:
                 print(f"Error fetching repositories for {org_name}: {response.status}")
                 break
@@ -69,13 +237,16 @@ async def fetch_repositories(session: aiohttp.ClientSession, org_name: str,
 
 
 async def fetch_last_modified_date(session: aiohttp.ClientSession, repo_full_name: str,
-                                   file_path: str, api_key: str) -> str:
+                                   file_path: str, api_key: str,
+                                   rate_limiter: RateLimiter | None = None) -> str:
     """
     Fetches the last commit date for a given file in the repository by checking its commit history.
     Returns the date in "%Y-%m-%d" format (e.g., "2023-09-26").
-    This function handles rate limiting and retry logic for 403 errors.
+    Requests go through the shared rate_limiter, which pauses and retries rate limited requests.
     """
-    url = f"https://api.github.com/repos/{repo_full_name}/commits"
+    if rate_limiter is None:
+        rate_limiter = RateLimiter()
+    url = f"{GITHUB_API_URL}/repos/{repo_full_name}/commits"
     headers = {
         "Authorization": f"token {api_key}",
         "Accept": "application/vnd.github.v3+json"
@@ -86,7 +257,7 @@ async def fetch_last_modified_date(session: aiohttp.ClientSession, repo_full_nam
     }
 
     while True:
-        async with session.get(url, headers=headers, params=params) as response:
+        async with rate_limiter.get(session, url, headers=headers, params=params) as response:
             if response.status == 200:
                 commits = await response.json()
                 if commits:
@@ -94,52 +265,59 @@ async def fetch_last_modified_date(session: aiohttp.ClientSession, repo_full_nam
                                              "%Y-%m-%dT%H:%M:%SZ").strftime("%Y-%m-%d")  # Last commit date
                 else:
                     return "Unknown"  # If no commits found, return "Unknown"
-            elif response.status == 403:
-                # Sleep for rate limit handling or abuse detection and then retry
-                await handle_rate_limit(response.headers)
+            elif rate_limiter.is_rate_limited(response):
+                # All requests are paused by the rate limiter, retry once it resumes
+                continue
             else:
                 print(f"Error fetching date for {repo_full_name}/{file_path}: {response.status}")
                 return "Unknown"
 
 
-async def fetch_file_content(session: aiohttp.ClientSession, url: str) -> str:
+async def fetch_file_content(session: aiohttp.ClientSession, url: str,
+                             rate_limiter: RateLimiter | None = None, headers: dict | None = None) -> str:
     """
     Fetch the content of the given file URL using aiohttp.
-    This function handles rate limiting and retry logic for 403 errors.
+    Requests go through the shared rate_limiter, which pauses and retries rate limited requests.
+    Downloads from the raw host don't use the API budget.
+    headers - e.g. Authorization for raw downloads of private repository files
     """
+    if rate_limiter is None:
+        rate_limiter = RateLimiter()
     while True:
-        async with session.get(url) as response:
+        async with rate_limiter.get(session, url, api=False, headers=headers) as response:
             if response.status == 200:
                 return await response.text()
-            elif response.status == 403:
-                # Sleep for rate limit handling or abuse detection and then retry
-                await handle_rate_limit(response.headers)
+            elif rate_limiter.is_rate_limited(response):
+                # All requests are paused by the rate limiter, retry once it resumes
+                continue
             else:
                 print(f"Failed to fetch file: {response.status}")
                 return ""
 
 
 async def fetch_repo_contents(session: aiohttp.ClientSession, repo_full_name: str,
-                              api_key: str, path="") -> list[dict]:
+                              api_key: str, path="", rate_limiter: RateLimiter | None = None) -> list[dict]:
     """
     Returns the contents of a given repository, which can include files and directories.
     The contents are represented as a list of dictionaries.
-    This function handles rate limiting and retry logic for 403 errors.
+    Requests go through the shared rate_limiter, which pauses and retries rate limited requests.
     """
-    url = f"https://api.github.com/repos/{repo_full_name}/contents/{path}"
+    if rate_limiter is None:
+        rate_limiter = RateLimiter()
+    url = f"{GITHUB_API_URL}/repos/{repo_full_name}/contents/{path}"
     headers = {
         "Authorization": f"token {api_key}",
         "Accept": "application/vnd.github.v3+json"
     }
 
     while True:
-        async with session.get(url, headers=headers) as response:
+        async with rate_limiter.get(session, url, headers=headers) as response:
             if response.status == 200:
                 # Successfully fetched the content
                 return await response.json()
-            elif response.status == 403:
-                # Sleep for rate limit handling or abuse detection and then retry
-                await handle_rate_limit(response.headers)
+            elif rate_limiter.is_rate_limited(response):
+                # All requests are paused by the rate limiter, retry once it resumes
+                continue
             else:
                 # Other errors (e.g., 404, 500)
                 print(f"Error fetching contents for {repo_full_name}/{path}: {response.status}")
@@ -147,48 +325,204 @@ async def fetch_repo_contents(session: aiohttp.ClientSession, repo_full_name: st
 
 
 async def fetch_md_files(session: aiohttp.ClientSession, repo_full_name: str,
-                         api_key: str, path="") -> list[dict]:
+                         api_key: str, path="", rate_limiter: RateLimiter | None = None, skip=None) -> list[dict]:
     """
     Recursively fetches all Markdown (.md) files from the repository and directories.
     Returns a list of dictionaries with the file name, download URL, and other metadata.
+    skip - function(file url) returning True for files that shouldn't be downloaded (e.g. already ingested)
     """
-    contents = await fetch_repo_contents(session, repo_full_name, api_key, path)
+    if rate_limiter is None:
+        rate_limiter = RateLimiter()
+    contents = await fetch_repo_contents(session, repo_full_name, api_key, path, rate_limiter)
     md_files = []
 
     for item in contents:
         if item['type'] == 'file' and item['name'].endswith('.md'):
+            if skip is not None and skip(item['html_url']):
+                continue
             # Fetch .md file along with its download URL and other metadata
             md_files.append({
-                'content': await fetch_file_content(session, item['download_url']),
+                'content': await fetch_file_content(session, item['download_url'], rate_limiter,
+                                                    headers={"Authorization": f"token {api_key}"}),
                 'metadata': {
                     'url': item['html_url'],
                     'title': repo_full_name.split('/')[-1] + '/' + item['path'],
                     'headline': '', # url_scraper document has this field
                     'date': await fetch_last_modified_date(session, repo_full_name=repo_full_name,
-                                                           file_path=item['path'], api_key=api_key)
+                                                           file_path=item['path'], api_key=api_key,
+                                                           rate_limiter=rate_limiter)
                 }
             })
         elif (item['type'] == 'dir' and
               item['name'] not in [".github"]):  # If it's a directory, recursively fetch contents
-            md_files += await fetch_md_files(session, repo_full_name, api_key, item['path'])
+            md_files += await fetch_md_files(session, repo_full_name, api_key, item['path'], rate_limiter, skip)
 
     return md_files
 
 
-async def scrape_md_files(org_name: str, api_key: str, repo_limit=None) -> list[dict]:
+async def fetch_repo_tree(session: aiohttp.ClientSession, repo_full_name: str,
+                          api_key: str, branch: str, rate_limiter: RateLimiter | None = None) -> dict:
+    """
+    Returns the whole file tree of the given branch in a single request (git trees API with recursive=1).
+    The tree is represented as a dictionary with the 'tree' list of entries and the 'truncated' flag.
+    Requests go through the shared rate_limiter, which pauses and retries rate limited requests.
+    """
+    if rate_limiter is None:
+        rate_limiter = RateLimiter()
+    url = f"{GITHUB_API_URL}/repos/{repo_full_name}/git/trees/{quote(branch, safe='')}"
+    headers = {
+        "Authorization": f"token {api_key}",
+        "Accept": "application/vnd.github.v3+json"
+    }
+    params = {"recursive": "1"}
+
+    while True:
+        async with rate_limiter.get(session, url, headers=headers, params=params) as response:
+            if response.status == 200:
+                return await response.json()
+            elif rate_limiter.is_rate_limited(response):
+                # All requests are paused by the rate limiter, retry once it resumes
+                continue
+            else:
+                # Other errors (e.g., 404, 409 for an empty repository)
+                print(f"Error fetching tree for {repo_full_name}@{branch}: {response.status}")
+                return {"tree": [], "truncated": False}
+
+
+def is_md_path(path: str) -> bool:
+    """
+    Returns True for .md files outside of .github directories (same rule as fetch_md_files).
+    """
+    return path.endswith('.md') and ".github" not in path.split('/')[:-1]
+
+
+async def fetch_md_file(session: aiohttp.ClientSession, repo_full_name: str, branch: str,
+                        path: str, api_key: str, semaphore: asyncio.Semaphore,
+                        rate_limiter: RateLimiter | None = None) -> dict:
+    """
+    Downloads a single .md file and its last commit date.
+    Returns a dictionary in the same shape as fetch_md_files entries.
+    """
+    if rate_limiter is None:
+        rate_limiter = RateLimiter()
+    quoted_path = quote(path)
+    async with semaphore:
+        # Raw downloads of private repository files need the token too
+        content = await fetch_file_content(
+            session, f"{GITHUB_RAW_URL}/{repo_full_name}/{quote(branch)}/{quoted_path}", rate_limiter,
+            headers={"Authorization": f"token {api_key}"})
+        date = await fetch_last_modified_date(session, repo_full_name=repo_full_name,
+                                              file_path=path, api_key=api_key, rate_limiter=rate_limiter)
+    return {
+        'content': content,
+        'metadata': {
+            'url': f"https://github.com/{repo_full_name}/blob/{quote(branch)}/{quoted_path}",
+            'title': repo_full_name.split('/')[-1] + '/' + path,
+            'headline': '', # url_scraper document has this field
+            'date': date
+        }
+    }
+
+
+async def fetch_md_files_from_tree(session: aiohttp.ClientSession, repo: dict,
+                                   api_key: str, semaphore: asyncio.Semaphore,
+                                   rate_limiter: RateLimiter | None = None, skip=None) -> list[dict]:
+    """
+    Lists the repository with a single recursive tree request, filters .md paths locally
+    and downloads the files concurrently, bounded by the semaphore.
+    Falls back to fetch_md_files if GitHub truncated the tree.
+    skip - function(file url) returning True for files that shouldn't be downloaded (e.g. already ingested)
+    """
+    if rate_limiter is None:
+        rate_limiter = RateLimiter()
+    repo_full_name = repo['full_name']
+    branch = repo.get('default_branch') or "HEAD"
+    tree = await fetch_repo_tree(session, repo_full_name, api_key, branch, rate_limiter)
+    if tree.get('truncated'):
+        print(f"Tree of {repo_full_name} is truncated, listing it directory by directory.")
+        return await fetch_md_files(session, repo_full_name, api_key, rate_limiter=rate_limiter, skip=skip)
+
+    md_paths = [item['path'] for item in tree['tree'] if item['type'] == 'blob' and is_md_path(item['path'])]
+    if skip is not None:
+        md_paths = [path for path in md_paths
+                    if not skip(f"https://github.com/{repo_full_name}/blob/{quote(branch)}/{quote(path)}")]
+    tasks = [fetch_md_file(session, repo_full_name, branch, path, api_key, semaphore, rate_limiter)
+             for path in md_paths]
+    return list(await asyncio.gather(*tasks))
+
+
+async def scrape_md_files(org_name: str, api_key: str, repo_limit=None, listing="tree",
+                          max_concurrent_downloads=20, rate_limiter: RateLimiter | None = None,
+                          cache: HttpCache | None = None) -> list[dict]:
     """
     Main function to scrape .md files from all repositories in the organization.
-    Returns a list of dictionaries containing the repo_full_name, path, self_url,
-    html_url, git_url, download_url and last_modified.
+    Returns a list of dictionaries {content: string, metadata: dict}
+    metadata - url, title, headline, date
+    listing - "tree" lists each repository with one recursive git tree request,
+              "contents" walks the contents API directory by directory
+    max_concurrent_downloads - limit of files downloaded at once in "tree" listing
+    rate_limiter - scheduler shared by all requests, pass your own to inspect rate_limiter.report() afterwards
+    cache - on-disk cache, unchanged files are revalidated with conditional requests instead of downloaded
     """
+    if rate_limiter is None:
+        rate_limiter = RateLimiter()
     # Use this if you are having error with ssl
     # async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=ssl.create_default_context(cafile=certifi.where()))) as session:
     async with aiohttp.ClientSession() as session:
-        repos = await fetch_repositories(session, org_name, api_key, repo_limit)
+        if cache is not None:
+            session = CachedSession(session, cache)
+        repos = await fetch_repositories(session, org_name, api_key, repo_limit, rate_limiter)
 
         # Create async tasks for each repo to fetch .md files concurrently
-        tasks = [fetch_md_files(session, repo['full_name'], api_key) for repo in repos]
+        if listing == "tree":
+            semaphore = asyncio.Semaphore(max_concurrent_downloads)
+            tasks = [fetch_md_files_from_tree(session, repo, api_key, semaphore, rate_limiter) for repo in repos]
+        elif listing == "contents":
+            tasks = [fetch_md_files(session, repo['full_name'], api_key, rate_limiter=rate_limiter) for repo in repos]
+        else:
+            raise ValueError(f"Unknown listing mode: {listing}")
         all_md_files = await asyncio.gather(*tasks)
 
-        # Flatten the list of lists into a single list
-        return [md_file for repo_files in all_md_files for md_file in repo_files]
+    print(f"Rate limit usage: {rate_limiter.report()}")
+    # Flatten the list of lists into a single list
+    return [md_file for repo_files in all_md_files for md_file in repo_files]
+
+
+async def iter_md_files(org_name: str, api_key: str, repo_limit=None, max_concurrent_repos=4,
+                        max_concurrent_downloads=20, rate_limiter: RateLimiter | None = None,
+                        cache: HttpCache | None = None, skip=None):
+    """
+    Async generator yielding dictionaries {content: string, metadata: dict} repository by repository,
+    streaming alternative to scrape_md_files for corpora that shouldn't be held in memory at once.
+    At most max_concurrent_repos repositories are downloaded at the same time, the next one starts
+    only when the files of a finished one were consumed.
+    skip - function(file url) returning True for files that shouldn't be downloaded (e.g. already ingested)
+    """
+    if rate_limiter is None:
+        rate_limiter = RateLimiter()
+    async with aiohttp.ClientSession() as session:
+        if cache is not None:
+            session = CachedSession(session, cache)
+        repos = iter(await fetch_repositories(session, org_name, api_key, repo_limit, rate_limiter))
+        semaphore = asyncio.Semaphore(max_concurrent_downloads)
+
+        def start_next(pending: set) -> None:
+            repo = next(repos, None)
+            if repo is not None:
+                pending.add(asyncio.ensure_future(
+                    fetch_md_files_from_tree(session, repo, api_key, semaphore, rate_limiter, skip)))
+
+        pending = set()
+        for _ in range(max_concurrent_repos):
+            start_next(pending)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    for md_file in task.result():
+                        yield md_file
+                    start_next(pending)
+        finally:
+            for task in pending:
+                task.cancel()
+    print(f"Rate limit usage: {rate_limiter.report()}")
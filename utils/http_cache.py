@@ -0,0 +1,178 @@
+import aiohttp
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from multidict import CIMultiDict, CIMultiDictProxy
+
+
+class HttpCache:
+    """
+    On-disk cache of response bodies together with their validators (ETag / Last-Modified).
+    Bodies are stored as files, the index is a sqlite database in the same directory.
+    Least recently used entries are evicted when the total size of bodies exceeds max_size.
+    """
+
+    def __init__(self, cache_dir="./http_cache", max_size=500 * 1024 * 1024):
+        """
+        cache_dir - directory for bodies and the index
+        max_size - limit of the total size of cached bodies in bytes
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"))
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                size INTEGER,
+                last_used REAL
+            )
+        """)
+        self.db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(url: str, params=None, headers=None) -> str:
+        """Returns key of the request, requests differing only in credentials share the key."""
+        accept = (headers or {}).get("Accept", "")
+        request = json.dumps([url, sorted((params or {}).items()), accept], default=str)
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def body_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def lookup(self, key: str) -> dict | None:
+        """
+        Returns entry {etag, last_modified, content_type, body} or None if the key isn't cached.
+        The body is read right away, so an eviction while the conditional request is in flight doesn't lose it.
+        """
+        row = self.db.execute("SELECT etag, last_modified, content_type FROM entries WHERE key = ?",
+                              (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(self.body_path(key), "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "content_type": row[2], "body": body}
+
+    def conditional_headers(self, entry: dict) -> dict:
+        """Returns headers turning the request into a conditional one."""
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def touch(self, key: str) -> None:
+        """Marks the entry as recently used."""
+        self.db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.db.commit()
+
+    def store(self, key: str, url: str, headers, body: bytes) -> None:
+        """Stores body if the response has a validator, otherwise it couldn't be revalidated."""
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        path = self.body_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(body)
+        os.replace(path + ".tmp", path)
+        self.db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (key, url, etag, last_modified, headers.get("Content-Type"), len(body), time.time()))
+        self.db.commit()
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes least recently used entries until the cache fits in max_size."""
+        total_size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total_size <= self.max_size:
+            return
+        for key, size in self.db.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+            if total_size <= self.max_size:
+                break
+            if os.path.exists(self.body_path(key)):
+                os.remove(self.body_path(key))
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total_size -= size
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.close()
+
+
+class CachedResponse:
+    """
+    Response with already read body, exposing the part of aiohttp.ClientResponse used by the scrapers.
+    from_cache is True if the server answered 304 and the body comes from the cache.
+    """
+
+    def __init__(self, url: str, status: int, headers, body: bytes, from_cache=False):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.from_cache = from_cache
+
+    async def read(self) -> bytes:
+        return self.body
+
+    async def text(self, encoding=None) -> str:
+        if encoding is None:
+            content_type = self.headers.get("Content-Type", "")
+            encoding = "utf-8"
+            if "charset=" in content_type:
+                encoding = content_type.split("charset=")[-1].split(";")[0].strip().strip('"')
+        return self.body.decode(encoding, errors="replace")
+
+    async def json(self, **kwargs):
+        return json.loads(await self.text())
+
+
+class CachedSession:
+    """
+    Wrapper of aiohttp.ClientSession sending conditional requests for cached URLs.
+    Can be passed to the scrapers wherever a session is expected.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, cache: HttpCache):
+        self.session = session
+        self.cache = cache
+
+    @asynccontextmanager
+    async def get(self, url: str, headers=None, params=None, **kwargs):
+        key = self.cache.make_key(url, params, headers)
+        entry = self.cache.lookup(key)
+        request_headers = dict(headers or {})
+        if entry is not None:
+            request_headers.update(self.cache.conditional_headers(entry))
+
+        async with self.session.get(url, headers=request_headers, params=params, **kwargs) as response:
+            if response.status == 304 and entry is not None:
+                self.cache.hits += 1
+                # Keep fresh headers (e.g. rate limit) but restore the type of the cached body
+                response_headers = CIMultiDict(response.headers)
+                if entry["content_type"]:
+                    response_headers["Content-Type"] = entry["content_type"]
+                self.cache.touch(key)
+                cached = CachedResponse(str(response.url), 200, CIMultiDictProxy(response_headers),
+                                        entry["body"], from_cache=True)
+            else:
+                body = await response.read()
+                if response.status == 200:
+                    self.cache.misses += 1
+                    self.cache.store(key, url, response.headers, body)
+                cached = CachedResponse(str(response.url), response.status, response.headers, body)
+        yield cached
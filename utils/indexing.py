@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+from haystack import Document, component
+from haystack.document_stores.types import DocumentStore, DuplicatePolicy
+
+# Metadata added by DocumentSplitter, it changes whenever any other part of the source document changes
+SPLIT_META_FIELDS = ("source_id", "page_number", "split_id", "split_idx_start", "_split_overlap")
+
+
+def chunk_source(document: Document) -> str:
+    """Returns source of the chunk - page url for docs.wire.com, file url for GitHub."""
+    return str(document.meta.get("url", ""))
+
+
+def chunk_id(document: Document) -> str:
+    """
+    Returns deterministic id of the chunk based on its source and a hash of its content and metadata,
+    so an unchanged chunk gets the same id on every run.
+    """
+    meta = {key: value for key, value in document.meta.items() if key not in SPLIT_META_FIELDS}
+    content_hash = hashlib.sha256(
+        (document.content or "").encode() + json.dumps(meta, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return hashlib.sha256(f"{chunk_source(document)}\n{content_hash}".encode()).hexdigest()
+
+
+class IndexManifest:
+    """
+    Local record of chunks already written to a document store, stored as JSON {chunk_id: source}.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.chunks = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.chunks = json.load(f)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.chunks, f, ensure_ascii=False)
+        os.replace(self.path + ".tmp", self.path)
+
+
+@component
+class IncrementalIndexer:
+    """
+    Writes split documents to the document store, embedding only chunks that are not in the manifest yet
+    and deleting chunks that are no longer produced from the corpus (changed or removed sources).
+    Expects the whole corpus of the document store on every run.
+    """
+
+    def __init__(self, document_store: DocumentStore, embedder, manifest_path: str):
+        """
+        document_store - store of a single namespace (e.g. docs-wire)
+        embedder - document embedder, e.g. SentenceTransformersDocumentEmbedder
+        manifest_path - path of the JSON manifest of this document store
+        """
+        self.document_store = document_store
+        self.embedder = embedder
+        self.manifest_path = manifest_path
+
+    def warm_up(self):
+        if hasattr(self.embedder, "warm_up"):
+            self.embedder.warm_up()
+
+    @component.output_types(written=int, deleted=int, unchanged=int)
+    def run(self, documents: list[Document]):
+        manifest = IndexManifest(self.manifest_path)
+
+        current = {}
+        for document in documents:
+            document.id = chunk_id(document)
+            current[document.id] = document  # Identical chunks of the same source are indexed once
+
+        new_documents = [document for document_id, document in current.items() if document_id not in manifest.chunks]
+        stale_ids = [document_id for document_id in manifest.chunks if document_id not in current]
+
+        if new_documents:
+            embedded = self.embedder.run(documents=new_documents)["documents"]
+            self.document_store.write_documents(embedded, policy=DuplicatePolicy.OVERWRITE)
+        if stale_ids:
+            self.document_store.delete_documents(stale_ids)
+
+        manifest.chunks = {document_id: chunk_source(document) for document_id, document in current.items()}
+        manifest.save()
+        return {"written": len(new_documents), "deleted": len(stale_ids),
+                "unchanged": len(current) - len(new_documents)}
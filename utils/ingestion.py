@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import time
+from haystack import Document
+from haystack.document_stores.types import DuplicatePolicy
+from utils.indexing import IndexManifest, chunk_id, chunk_source
+
+
+def item_key(item: dict) -> str:
+    """Returns key of a scraped item - url for GitHub files, url and headline for docs.wire.com sections."""
+    metadata = item["metadata"]
+    return f"{metadata['url']}#{metadata['headline']}" if metadata.get("headline") else metadata["url"]
+
+
+class Checkpoint:
+    """
+    JSON lines record of items whose chunks are all written to the document store, with their source and chunk ids.
+    A line is appended (and flushed) for every finished item, an interrupted run resumes by skipping them.
+    The checkpoint is removed once the run is completed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.done = {}  # {item key: (source, ids of its chunks)}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self.done[record["key"]] = (record["source"], record["ids"])
+                    except (json.JSONDecodeError, KeyError):
+                        pass  # Line torn by the interruption
+        self.file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, key: str):
+        return key in self.done
+
+    def add(self, key: str, source: str, ids: list[str]) -> None:
+        self.done[key] = (source, ids)
+        self.file.write(json.dumps({"key": key, "source": source, "ids": ids, "time": time.time()},
+                                   ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def chunks(self) -> dict[str, str]:
+        """Returns {chunk id: source} of all items of the run."""
+        return {chunk_id: source for source, ids in self.done.values() for chunk_id in ids}
+
+    def complete(self) -> None:
+        """Removes the checkpoint of a completed run, the next run starts from the beginning."""
+        self.close()
+        os.remove(self.path)
+        self.done = {}
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def ingest(items, splitter, embedder, document_store, checkpoint: Checkpoint, manifest: IndexManifest,
+                 queue_size=64, batch_size=32, save_every: int | None = None) -> dict:
+    """
+    Splits, embeds and writes items {content, metadata} from the async iterable as they come.
+    Every stage runs concurrently and is connected to the next one by a bounded queue,
+    so a slow stage (usually embedding) pauses the scraping instead of letting items pile up in memory.
+    Chunks get deterministic ids (chunk_id) and overwrite existing ones, so an item interrupted halfway
+    is written again in full on the next run.
+    Like IncrementalIndexer, expects the whole corpus of the document store: chunks already in the manifest
+    are not written again, and once all items are ingested the chunks in the manifest that weren't produced
+    (changed or removed sources) are deleted, the manifest is updated and the checkpoint removed.
+    splitter - component splitting documents, e.g. StructureAwareSplitter
+    embedder - document embedder, e.g. CachedDocumentEmbedder
+    manifest - manifest of the document store, shared with IncrementalIndexer
+    save_every - for stores saved with save() instead of on every write (LocalDocumentStore with autosave=False),
+                 number of chunks written between saves, items are checkpointed once saved
+    Returns counts of ingested and skipped items, written, unchanged and deleted chunks.
+    """
+    loop = asyncio.get_running_loop()
+    documents_queue = asyncio.Queue(maxsize=queue_size)
+    chunks_queue = asyncio.Queue(maxsize=queue_size)
+    # Holds batches, so it's bounded to about the same number of chunks
+    embedded_queue = asyncio.Queue(maxsize=max(queue_size // batch_size, 1))
+    stats = {"items": 0, "skipped": 0, "chunks": 0, "unchanged": 0, "deleted": 0}
+    # {item key: [number of its chunks not written yet, source, ids of its chunks]}
+    remaining = {}
+    # Items whose chunks are all written, not checkpointed yet [(key, source, ids)]
+    finished_items = []
+
+    await loop.run_in_executor(None, splitter.warm_up)
+    await loop.run_in_executor(None, embedder.warm_up)
+
+    async def read_items():
+        async for item in items:
+            key = item_key(item)
+            if key in checkpoint or key in remaining:
+                stats["skipped"] += 1
+                continue
+            remaining[key] = None
+            document = Document(content=item["content"], meta=item["metadata"])
+            await documents_queue.put((key, chunk_source(document), document))
+        await documents_queue.put(None)
+
+    async def split():
+        while (entry := await documents_queue.get()) is not None:
+            key, source, document = entry
+            chunks = (await loop.run_in_executor(None, splitter.run, [document]))["documents"]
+            for chunk in chunks:
+                chunk.id = chunk_id(chunk)
+            new_chunks = [chunk for chunk in chunks if chunk.id not in manifest.chunks]
+            stats["unchanged"] += len(chunks) - len(new_chunks)
+            if not new_chunks:
+                del remaining[key]
+                finished_items.append((key, source, [chunk.id for chunk in chunks]))
+                continue
+            remaining[key] = [len(new_chunks), source, [chunk.id for chunk in chunks]]
+            for chunk in new_chunks:
+                await chunks_queue.put((key, chunk))
+        await chunks_queue.put(None)
+
+    async def next_batch(queue: asyncio.Queue) -> tuple[list, bool]:
+        """Returns up to batch_size entries already in the queue (waiting only for the first one) and end flag."""
+        batch = []
+        entry = await queue.get()
+        while entry is not None:
+            batch.append(entry)
+            if len(batch) == batch_size or queue.empty():
+                return batch, False
+            entry = await queue.get()
+        return batch, True
+
+    async def embed():
+        finished = False
+        while not finished:
+            batch, finished = await next_batch(chunks_queue)
+            if batch:
+                embedded = (await loop.run_in_executor(
+                    None, lambda: embedder.run(documents=[chunk for _, chunk in batch])))["documents"]
+                await embedded_queue.put([(key, chunk) for (key, _), chunk in zip(batch, embedded)])
+        await embedded_queue.put(None)
+
+    async def commit():
+        """Saves the store if needed and checkpoints the finished items."""
+        items_done = finished_items[:]
+        finished_items.clear()
+        if save_every is not None:
+            await loop.run_in_executor(None, document_store.save)
+        for key, source, ids in items_done:
+            checkpoint.add(key, source, ids)
+        printed = stats["items"] // 100
+        stats["items"] += len(items_done)
+        if stats["items"] // 100 > printed:
+            print(f"Ingested {stats['items']} items, {stats['chunks']} chunks, "
+                  f"skipped {stats['skipped']} already ingested")
+
+    async def write():
+        unsaved = 0
+        while (batch := await embedded_queue.get()) is not None:
+            await loop.run_in_executor(None, lambda: document_store.write_documents(
+                [chunk for _, chunk in batch], policy=DuplicatePolicy.OVERWRITE))
+            stats["chunks"] += len(batch)
+            unsaved += len(batch)
+            for key, _ in batch:
+                remaining[key][0] -= 1
+                if remaining[key][0] == 0:
+                    finished_items.append((key, *remaining.pop(key)[1:]))
+            if save_every is None or unsaved >= save_every:
+                await commit()
+                unsaved = 0
+        await commit()
+
+    async def complete():
+        """Deletes chunks of the manifest the run didn't produce and records the run's chunks in the manifest."""
+        current = checkpoint.chunks()
+        stale_ids = [document_id for document_id in manifest.chunks if document_id not in current]
+        if stale_ids:
+            await loop.run_in_executor(None, document_store.delete_documents, stale_ids)
+            if save_every is not None:
+                await loop.run_in_executor(None, document_store.save)
+        stats["deleted"] = len(stale_ids)
+        manifest.chunks = current
+        manifest.save()
+        checkpoint.complete()
+
+    tasks = [asyncio.ensure_future(stage()) for stage in (read_items, split, embed, write)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    await complete()
+    return stats
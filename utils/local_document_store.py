@@ -0,0 +1,283 @@
+import json
+import os
+import threading
+from dataclasses import replace
+from typing import Any
+import numpy as np
+from haystack import Document, component, default_from_dict, default_to_dict
+from haystack.document_stores.errors import DuplicateDocumentError
+from haystack.document_stores.types import DuplicatePolicy, FilterPolicy, apply_filter_policy
+from haystack.utils.filters import document_matches_filter
+
+
+class LocalDocumentStore:
+    """
+    Offline drop-in for PineconeDocumentStore.
+    Each namespace keeps its documents in a JSON lines file and their normalized embeddings
+    in a contiguous float32 matrix (.npy, memory-mapped on load), top-k is scored with one matrix product.
+    quantization="int8" scores against an int8 copy of the matrix with a scale per row, which takes 4x less memory,
+    the float32 matrix stays memory-mapped and is only read to save changes or return embeddings.
+    Writes and deletes are collected and applied to the matrix at once before the next read or save.
+    A new version saved by another process (ingest.py, IncrementalIndexer) is loaded before the next retrieval.
+    """
+
+    def __init__(self, path="./local_store", namespace="default", dimension=384, quantization: str | None = None,
+                 autosave=True):
+        """
+        path - directory shared by all namespaces
+        namespace - name of the document collection, like Pinecone namespace
+        dimension - embedding dimension
+        quantization - None for float32 or "int8"
+        autosave - save the files after every write and delete, False leaves it to save() (for bulk writes)
+        """
+        if quantization not in (None, "int8"):
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.path = path
+        self.namespace = namespace
+        self.dimension = dimension
+        self.quantization = quantization
+        self.autosave = autosave
+
+        self.version = 0  # Version of the saved files, increased on every save
+        self.manifest_mtime = None
+        self.lock = threading.Lock()  # Retrievals from concurrent requests don't see a half-loaded version
+        self.documents = []
+        self.pending = []  # Normalized vectors of documents appended since the last compact
+        self.removed = set()  # Positions of deleted or overwritten documents
+        self.positions = {}
+        self.float_matrix = np.zeros((0, dimension), dtype=np.float32)
+        self.vectors = self.float_matrix
+        self.scales = None
+        self.load()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.path, f"{self.namespace}.json")
+
+    def data_paths(self, version: int) -> tuple[str, str]:
+        """Returns paths of the documents and vectors files of the saved version."""
+        prefix = os.path.join(self.path, f"{self.namespace}.{version}")
+        return f"{prefix}.documents.jsonl", f"{prefix}.vectors.npy"
+
+    def load(self) -> None:
+        """Loads the version of the files named by the manifest and checks that documents and vectors match."""
+        if not os.path.exists(self.manifest_path):
+            return
+        manifest_mtime = os.stat(self.manifest_path).st_mtime_ns
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        documents_path, vectors_path = self.data_paths(manifest["version"])
+        with open(documents_path, "r", encoding="utf-8") as f:
+            documents = [Document.from_dict(json.loads(line)) for line in f if line.strip()]
+        vectors = np.load(vectors_path, mmap_mode="r")
+        if not len(documents) == len(vectors) == manifest["rows"]:
+            raise ValueError(f"Local document store {self.namespace} in {self.path} is inconsistent: "
+                             f"{len(documents)} documents, {len(vectors)} vectors, {manifest['rows']} in the manifest. "
+                             f"Index the namespace again.")
+        self.version = manifest["version"]
+        self.manifest_mtime = manifest_mtime
+        self.documents = documents
+        self.positions = {document.id: i for i, document in enumerate(self.documents)}
+        self.set_vectors(vectors)
+
+    def refresh(self) -> None:
+        """Loads the saved version again if another process replaced the manifest since it was read."""
+        if self.pending or self.removed:
+            return  # Changes of this process not saved yet
+        try:
+            if os.stat(self.manifest_path).st_mtime_ns == self.manifest_mtime:
+                return
+            self.load()
+        except FileNotFoundError:
+            pass  # Files of the version were replaced by an even newer one, it's loaded next time
+
+    def current_version(self) -> int:
+        """Returns version of the saved store, loading it first if another process saved a newer one."""
+        with self.lock:
+            self.refresh()
+            return self.version
+
+    def save(self) -> None:
+        """
+        Writes documents and vectors to files of a new version and then replaces the manifest naming it,
+        so an interrupted save leaves the previous version in use.
+        """
+        self.compact()
+        os.makedirs(self.path, exist_ok=True)
+        version = self.version + 1
+        documents_path, vectors_path = self.data_paths(version)
+        with open(documents_path, "w", encoding="utf-8") as f:
+            for document in self.documents:
+                f.write(json.dumps(replace(document, embedding=None).to_dict(flatten=False), ensure_ascii=False) + "\n")
+        with open(vectors_path, "wb") as f:
+            np.save(f, self.float_vectors())
+        with open(self.manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": version, "rows": len(self.documents)}, f)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+
+        for path in self.data_paths(self.version):
+            if os.path.exists(path):
+                os.remove(path)
+        self.version = version
+        self.manifest_mtime = os.stat(self.manifest_path).st_mtime_ns
+
+    def set_vectors(self, vectors: np.ndarray) -> None:
+        """Sets float32 matrix and the matrix used for scoring (the same one, or int8 with a scale per row)."""
+        self.float_matrix = vectors
+        if self.quantization == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127 if len(vectors) else np.zeros(0, dtype=np.float32)
+            scales = np.where(scales == 0, 1, scales).astype(np.float32)
+            self.vectors = np.round(vectors / scales[:, None]).astype(np.int8)
+            self.scales = scales
+        else:
+            self.vectors = vectors
+
+    def float_vectors(self) -> np.ndarray:
+        return np.asarray(self.float_matrix, dtype=np.float32)
+
+    def to_dict(self) -> dict[str, Any]:
+        return default_to_dict(self, path=self.path, namespace=self.namespace, dimension=self.dimension,
+                               quantization=self.quantization, autosave=self.autosave)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "LocalDocumentStore":
+        return default_from_dict(cls, data)
+
+    def count_documents(self) -> int:
+        return len(self.positions)
+
+    def filter_documents(self, filters: dict[str, Any] | None = None) -> list[Document]:
+        self.compact()
+        vectors = self.float_vectors()
+        return [replace(document, embedding=vectors[i].tolist())
+                for i, document in enumerate(self.documents)
+                if not filters or document_matches_filter(filters, document)]
+
+    def write_documents(self, documents: list[Document], policy: DuplicatePolicy = DuplicatePolicy.NONE) -> int:
+        """Stores documents with normalized embeddings, documents without embedding get a zero vector."""
+        if policy == DuplicatePolicy.NONE:
+            policy = DuplicatePolicy.FAIL
+
+        new_documents = {}
+        for document in documents:
+            if document.id in self.positions or document.id in new_documents:
+                if policy == DuplicatePolicy.FAIL:
+                    raise DuplicateDocumentError(f"ID '{document.id}' already exists in the document store.")
+                if policy == DuplicatePolicy.SKIP:
+                    continue
+            new_documents[document.id] = document
+        if not new_documents:
+            return 0
+
+        # Overwritten documents are removed and appended again
+        self.remove(list(new_documents))
+        added = np.zeros((len(new_documents), self.dimension), dtype=np.float32)
+        for i, document in enumerate(new_documents.values()):
+            if document.embedding is not None:
+                added[i] = document.embedding
+        norms = np.linalg.norm(added, axis=1, keepdims=True)
+        added = added / np.where(norms == 0, 1, norms)
+
+        for document in new_documents.values():
+            self.positions[document.id] = len(self.documents)
+            self.documents.append(replace(document, embedding=None, score=None))
+        self.pending.append(added)
+        if self.autosave:
+            self.save()
+        return len(new_documents)
+
+    def remove(self, document_ids: list[str]) -> None:
+        """Marks documents as removed, they are dropped from the matrix by compact."""
+        for document_id in document_ids:
+            if document_id in self.positions:
+                self.removed.add(self.positions.pop(document_id))
+
+    def compact(self) -> None:
+        """Appends the pending vectors to the matrix and drops removed documents, with a single copy."""
+        if not self.pending and not self.removed:
+            return
+        vectors = np.concatenate([self.float_vectors(), *self.pending]) if self.pending else self.float_vectors()
+        if self.removed:
+            kept = [i for i in range(len(self.documents)) if i not in self.removed]
+            self.documents = [self.documents[i] for i in kept]
+            self.positions = {document.id: i for i, document in enumerate(self.documents)}
+            vectors = vectors[kept]
+        self.pending = []
+        self.removed = set()
+        self.set_vectors(vectors)
+
+    def delete_documents(self, document_ids: list[str]) -> None:
+        self.remove(document_ids)
+        if self.autosave:
+            self.save()
+
+    def embedding_retrieval(self, query_embedding: list[float], filters: dict[str, Any] | None = None,
+                            top_k=10, return_embedding=False) -> list[Document]:
+        """Returns top_k documents by cosine similarity to the query embedding."""
+        with self.lock:
+            self.refresh()
+            self.compact()
+            documents, vectors, scales, float_matrix = self.documents, self.vectors, self.scales, self.float_matrix
+        if not documents:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1)
+
+        if self.quantization == "int8":
+            # Scored in blocks, so the int8 matrix is never converted to float32 as a whole
+            scores = np.concatenate([vectors[start:start + 16384] @ query
+                                     for start in range(0, len(vectors), 16384)]) * scales
+        else:
+            scores = vectors @ query
+
+        if filters:
+            mask = np.array([document_matches_filter(filters, document) for document in documents])
+            scores = np.where(mask, scores, -np.inf)
+            top_k = min(top_k, int(mask.sum()))
+        top_k = min(top_k, len(scores))
+        if top_k <= 0:
+            return []
+
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        embeddings = np.asarray(float_matrix[top], dtype=np.float32) if return_embedding else None
+        return [replace(documents[i], score=float(scores[i]),
+                        embedding=embeddings[n].tolist() if return_embedding else None)
+                for n, i in enumerate(top)]
+
+
+@component
+class LocalEmbeddingRetriever:
+    """
+    Drop-in for PineconeEmbeddingRetriever working with LocalDocumentStore.
+    """
+
+    def __init__(self, *, document_store: LocalDocumentStore, filters: dict[str, Any] | None = None,
+                 top_k=10, filter_policy=FilterPolicy.REPLACE):
+        if not isinstance(document_store, LocalDocumentStore):
+            raise ValueError("document_store must be an instance of LocalDocumentStore")
+        self.document_store = document_store
+        self.filters = filters or {}
+        self.top_k = top_k
+        self.filter_policy = (filter_policy if isinstance(filter_policy, FilterPolicy)
+                              else FilterPolicy.from_str(filter_policy))
+
+    def to_dict(self) -> dict[str, Any]:
+        return default_to_dict(self, document_store=self.document_store.to_dict(), filters=self.filters,
+                               top_k=self.top_k, filter_policy=self.filter_policy.value)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "LocalEmbeddingRetriever":
+        init_params = data["init_parameters"]
+        init_params["document_store"] = LocalDocumentStore.from_dict(init_params["document_store"])
+        if "filter_policy" in init_params:
+            init_params["filter_policy"] = FilterPolicy.from_str(init_params["filter_policy"])
+        return default_from_dict(cls, data)
+
+    @component.output_types(documents=list[Document])
+    def run(self, query_embedding: list[float], filters: dict[str, Any] | None = None,
+            top_k: int | None = None):
+        filters = apply_filter_policy(self.filter_policy, self.filters, filters)
+        documents = self.document_store.embedding_retrieval(query_embedding, filters=filters,
+                                                            top_k=top_k or self.top_k)
+        return {"documents": documents}
@@ -0,0 +1,108 @@
+import json
+import os
+import time
+from functools import lru_cache
+from haystack import Document
+from prometheus_client import Counter, Histogram, start_http_server
+from utils.context_packing import make_token_counter
+
+COMPONENT_SECONDS = Histogram("rag_component_seconds", "Wall time of pipeline components", ["component"])
+COMPONENT_DOCUMENTS = Histogram("rag_component_documents", "Documents received and returned by pipeline components",
+                                ["component", "direction"], buckets=(0, 1, 5, 10, 25, 50, 100, 250))
+REQUEST_SECONDS = Histogram("rag_request_seconds", "Wall time of answering a question", ["status"],
+                            buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80))
+TOKENS = Counter("rag_tokens", "Tokens of generator prompts and completions", ["type"])
+TOKENS_SAVED = Counter("rag_context_tokens_saved", "Prompt tokens saved by context packing")
+ANSWER_CACHE = Counter("rag_answer_cache", "Answer cache lookups", ["result"])
+
+
+@lru_cache(maxsize=None)
+def token_counter(model: str):
+    return make_token_counter(model)
+
+
+def count_documents(values: dict) -> int | None:
+    """Returns number of documents in the inputs or outputs of a component, None if there are no documents."""
+    count = None
+    for value in values.values():
+        if isinstance(value, list) and value and all(isinstance(item, list) for item in value):
+            value = [item for items in value for item in items]  # Variadic input, e.g. of DocumentJoiner
+        if isinstance(value, list) and value and all(isinstance(item, Document) for item in value):
+            count = (count or 0) + len(value)
+    return count
+
+
+class PipelineTrace:
+    """
+    Record of answering one question: wall time and documents of every component,
+    tokens of the generator, answer cache result and total time.
+    """
+
+    def __init__(self, question: str, session: str | None = None):
+        self.question = question
+        self.session = session
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.components = {}
+        self.tokens = {}
+        self.cache = None
+
+    def record_component(self, name: str, inputs: dict, outputs: dict, seconds: float) -> None:
+        self.components[name] = {"seconds": seconds, "documents_in": count_documents(inputs),
+                                 "documents_out": count_documents(outputs)}
+        for meta in outputs.get("meta") or []:
+            if not isinstance(meta, dict):
+                continue
+            if "input_tokens_saved" in meta:
+                self.tokens["context_saved"] = meta["input_tokens_saved"]
+            if "prompt" in inputs and "replies" in outputs:
+                self.record_tokens(inputs["prompt"], outputs["replies"], meta)
+
+    def record_tokens(self, prompt: str, replies: list[str], meta: dict) -> None:
+        """Records usage reported by the generator, streamed responses have none, so they are counted locally."""
+        usage = meta.get("usage") or {}
+        if usage.get("prompt_tokens") is not None:
+            self.tokens["prompt"] = usage["prompt_tokens"]
+            self.tokens["completion"] = usage.get("completion_tokens", 0)
+        else:
+            count_tokens = token_counter(meta.get("model") or "gpt-4o-mini")
+            self.tokens["prompt"] = count_tokens(prompt)
+            self.tokens["completion"] = sum(count_tokens(reply) for reply in replies)
+            self.tokens["estimated"] = True
+
+    def finish(self, status: str) -> dict:
+        """Updates the metrics and returns the record of the request."""
+        seconds = time.perf_counter() - self.start
+        REQUEST_SECONDS.labels(status).observe(seconds)
+        for name, record in self.components.items():
+            COMPONENT_SECONDS.labels(name).observe(record["seconds"])
+            for direction in ("in", "out"):
+                if record[f"documents_{direction}"] is not None:
+                    COMPONENT_DOCUMENTS.labels(name, direction).observe(record[f"documents_{direction}"])
+        for token_type in ("prompt", "completion"):
+            if token_type in self.tokens:
+                TOKENS.labels(token_type).inc(self.tokens[token_type])
+        if self.tokens.get("context_saved"):
+            TOKENS_SAVED.inc(self.tokens["context_saved"])
+        if self.cache is not None:
+            ANSWER_CACHE.labels(self.cache).inc()
+        return {"time": self.started, "session": self.session, "question": self.question, "status": status,
+                "seconds": seconds, "cache": self.cache, "components": self.components, "tokens": self.tokens}
+
+
+class RequestLog:
+    """Appends records of requests as JSON lines."""
+
+    def __init__(self, path="./logs/requests.jsonl"):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def write(self, record: dict) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def start_metrics_server(port=8000) -> None:
+    """Serves the metrics in Prometheus text format at http://0.0.0.0:<port>/metrics."""
+    start_http_server(port)
+    print(f"Metrics served at http://0.0.0.0:{port}/metrics")
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor
+from functools import partial
+import networkx as nx
+from haystack import Pipeline
+
+
+def collect_inputs(pipeline: Pipeline, name: str, data: dict, outputs: dict) -> dict:
+    """Returns inputs of the component from the run data and outputs of its senders."""
+    inputs = dict(data.get(name, {}))
+    for sender, _, connection in pipeline.graph.in_edges(name, data=True):
+        value = outputs[sender][connection["from_socket"].name]
+        socket = connection["to_socket"]
+        if socket.is_variadic:
+            inputs.setdefault(socket.name, []).append(value)
+        else:
+            inputs[socket.name] = value
+    return inputs
+
+
+def unconsumed_outputs(pipeline: Pipeline, outputs: dict) -> dict:
+    """Returns outputs not sent to other components, the same ones Pipeline.run returns."""
+    result = {}
+    for name, component_outputs in outputs.items():
+        consumed = {connection["from_socket"].name for _, _, connection in pipeline.graph.out_edges(name, data=True)}
+        left = {socket: value for socket, value in component_outputs.items() if socket not in consumed}
+        if left:
+            result[name] = left
+    return result
+
+
+async def run_pipeline_async(pipeline: Pipeline, data: dict, executor: Executor | None = None,
+                             precomputed: dict | None = None, trace=None) -> dict:
+    """
+    Runs acyclic pipeline with every component started as soon as all of its senders finished,
+    so independent branches (e.g. retrievers of different namespaces) run concurrently.
+    Components run in the executor (default thread pool), the event loop stays free.
+    data - dict{component_name: {input_name: value}}, like Pipeline.run
+    precomputed - dict{component_name: {output_name: value}} of components already run (e.g. text_embedder),
+    they are not run again and their outputs are sent to the receivers
+    trace - PipelineTrace recording wall time, inputs and outputs of every component
+    """
+    if not nx.is_directed_acyclic_graph(pipeline.graph):
+        raise ValueError("Only pipelines without loops can be run concurrently, use Pipeline.run instead")
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(executor, pipeline.warm_up)
+
+    outputs = dict(precomputed or {})
+    tasks = {}
+
+    async def run_component(name):
+        if name in outputs:
+            return
+        await asyncio.gather(*(tasks[sender] for sender in pipeline.graph.predecessors(name)))
+        inputs = collect_inputs(pipeline, name, data, outputs)
+        start = time.perf_counter()
+        outputs[name] = await loop.run_in_executor(executor, partial(pipeline.get_component(name).run, **inputs))
+        if trace is not None:
+            trace.record_component(name, inputs, outputs[name], time.perf_counter() - start)
+
+    # Topological order guarantees that tasks of all senders exist before their receivers are created
+    for name in nx.topological_sort(pipeline.graph):
+        tasks[name] = asyncio.ensure_future(run_component(name))
+    try:
+        await asyncio.gather(*tasks.values())
+    finally:
+        for task in tasks.values():
+            task.cancel()
+    return unconsumed_outputs(pipeline, outputs)
+
+
+class StreamCancelled(Exception):
+    """Raised in the generator thread to stop reading the stream of an abandoned answer."""
+
+
+async def stream_pipeline_async(pipeline: Pipeline, data: dict, generator_name="generator",
+                                executor: Executor | None = None, precomputed: dict | None = None, trace=None):
+    """
+    Async generator running the pipeline like run_pipeline_async, yielding (chunk, None) for every piece of text
+    streamed by the generator component and finally (None, outputs) once the whole pipeline finished.
+    Closing the async generator early (e.g. when a new question is asked) aborts the generation.
+    generator_name - component accepting streaming_callback in its run method (e.g. OpenAIGenerator)
+    """
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def streaming_callback(chunk):
+        # Called from the generator thread for every chunk of the response
+        if cancelled.is_set():
+            raise StreamCancelled()
+        loop.call_soon_threadsafe(chunks.put_nowait, chunk.content)
+
+    run_data = {**data, generator_name: {**data.get(generator_name, {}), "streaming_callback": streaming_callback}}
+    task = asyncio.ensure_future(run_pipeline_async(pipeline, run_data, executor, precomputed, trace))
+
+    def finished(_):
+        # Chunks are queued before the task finishes, so None always comes last
+        chunks.put_nowait(None)
+        # An aborted stream fails the task, nobody waits for its result anymore
+        if not task.cancelled():
+            task.exception()
+
+    task.add_done_callback(finished)
+    try:
+        while (chunk := await chunks.get()) is not None:
+            yield chunk, None
+        yield None, task.result()
+    finally:
+        cancelled.set()
+        task.cancel()
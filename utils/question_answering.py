@@ -0,0 +1,76 @@
+import asyncio
+import time
+from functools import partial
+from utils.answer_cache import AnswerCache
+from utils.pipeline_runner import run_pipeline_async, stream_pipeline_async
+
+
+# Returns embedding of the question computed by the text_embedder of the pipeline
+async def embed_question(question, pipeline, trace=None):
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, pipeline.warm_up)
+    embedder = pipeline.get_component("text_embedder")
+    start = time.perf_counter()
+    outputs = await loop.run_in_executor(None, partial(embedder.run, text=question))
+    if trace is not None:
+        trace.record_component("text_embedder", {"text": question}, outputs, time.perf_counter() - start)
+    return outputs["embedding"]
+
+
+# Returns cached answer to the question (None if there's none or no cache) and the question embedding if computed
+async def cached_answer(question, pipeline, answer_cache: AnswerCache | None = None, trace=None):
+    if answer_cache is None:
+        return None, await embed_question(question, pipeline, trace)
+    # Reading the index version may be a request (Pinecone), so it doesn't block the event loop
+    await asyncio.get_running_loop().run_in_executor(None, answer_cache.check_index)
+    answer = answer_cache.get(question)
+    if answer is not None:
+        if trace is not None:
+            trace.cache = "exact"
+        return answer, None
+    embedding = await embed_question(question, pipeline, trace)
+    answer = answer_cache.get_similar(embedding)
+    if trace is not None:
+        trace.cache = "semantic" if answer is not None else "miss"
+    return answer, embedding
+
+
+# Function to interact with the pipeline, independent components (e.g. retrievers) run concurrently
+async def ask_question(question, pipeline, answer_cache: AnswerCache | None = None, trace=None):
+    if question == "" or question is None:
+        return ""
+    answer, embedding = await cached_answer(question, pipeline, answer_cache, trace)
+    if answer is not None:
+        return answer
+    outputs = await run_pipeline_async(pipeline, {
+        "prompt_builder": {"question": question},
+        "answer_builder": {"query": question}
+    }, precomputed={"text_embedder": {"embedding": embedding}}, trace=trace)
+    answer = outputs['answer_builder']['answers'][0].data
+    if answer_cache is not None:
+        answer_cache.put(question, embedding, answer)
+    return answer
+
+
+# Async generator yielding the answer while it's being generated
+async def stream_question(question, pipeline, answer_cache: AnswerCache | None = None, trace=None):
+    if question == "" or question is None:
+        yield ""
+        return
+    answer, embedding = await cached_answer(question, pipeline, answer_cache, trace)
+    if answer is not None:
+        yield answer
+        return
+    answer = ""
+    async for chunk, outputs in stream_pipeline_async(pipeline, {
+        "prompt_builder": {"question": question},
+        "answer_builder": {"query": question}
+    }, precomputed={"text_embedder": {"embedding": embedding}}, trace=trace):
+        if chunk is not None:
+            answer += chunk
+            yield answer
+        else:
+            answer = outputs['answer_builder']['answers'][0].data
+            if answer_cache is not None:
+                answer_cache.put(question, embedding, answer)
+            yield answer
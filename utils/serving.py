@@ -0,0 +1,133 @@
+import copy
+import time
+import numpy as np
+from haystack import Pipeline
+
+# Questions used to warm up the query embedder and to compare its quantized version with float32
+SAMPLE_QUERIES = [
+    "What is federation?",
+    "How do I install Wire on-premise?",
+    "How are messages end-to-end encrypted?",
+    "How to set up SSO with SAML?",
+    "What is legal hold?",
+    "How do I add a guest to a conversation?",
+    "Which ports does the backend need?",
+    "How does Wire handle calls with many participants?",
+]
+
+
+class LatencyStats:
+    """Collects durations of an operation and reports their percentiles."""
+
+    def __init__(self, max_samples=10000):
+        self.max_samples = max_samples
+        self.samples = []
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        if len(self.samples) > self.max_samples:
+            del self.samples[:len(self.samples) - self.max_samples]
+
+    def report(self) -> dict:
+        if not self.samples:
+            return {"count": 0}
+        samples = np.asarray(self.samples) * 1000
+        return {"count": len(samples), "mean_ms": float(samples.mean()), "p50_ms": float(np.percentile(samples, 50)),
+                "p95_ms": float(np.percentile(samples, 95)), "max_ms": float(samples.max())}
+
+
+def embed_queries(embedder, queries: list[str], stats: LatencyStats | None = None) -> list[list[float]]:
+    embeddings = []
+    for query in queries:
+        start = time.perf_counter()
+        embeddings.append(embedder.run(text=query)["embedding"])
+        if stats is not None:
+            stats.add(time.perf_counter() - start)
+    return embeddings
+
+
+def quantize_text_embedder(embedder) -> None:
+    """
+    Replaces the model of a warmed up SentenceTransformersTextEmbedder with a copy
+    whose Linear layers are dynamically quantized to int8 (CPU inference).
+    The backend shared with other embedders of the same model keeps the float32 model.
+    """
+    import torch
+    backend = copy.copy(embedder.embedding_backend)
+    backend.model = torch.quantization.quantize_dynamic(backend.model, {torch.nn.Linear}, dtype=torch.qint8)
+    embedder.embedding_backend = backend
+
+
+def compare_retrieval(retrievers: list, reference: list[list[float]], candidate: list[list[float]]) -> dict:
+    """
+    Returns how close retrieval with candidate embeddings is to the reference ones:
+    cosine similarity of the embeddings and share of the reference top documents retrieved by the candidate.
+    """
+    reference_matrix = np.asarray(reference, dtype=np.float32)
+    candidate_matrix = np.asarray(candidate, dtype=np.float32)
+    cosines = (reference_matrix * candidate_matrix).sum(axis=1) / (
+        np.linalg.norm(reference_matrix, axis=1) * np.linalg.norm(candidate_matrix, axis=1))
+
+    overlaps = []
+    for retriever in retrievers:
+        for reference_embedding, candidate_embedding in zip(reference, candidate):
+            expected = {document.id for document in retriever.run(query_embedding=reference_embedding)["documents"]}
+            found = {document.id for document in retriever.run(query_embedding=candidate_embedding)["documents"]}
+            if expected:
+                overlaps.append(len(expected & found) / len(expected))
+    return {"min_cosine": float(cosines.min()),
+            "mean_overlap": float(np.mean(overlaps)) if overlaps else None,
+            "min_overlap": float(np.min(overlaps)) if overlaps else None}
+
+
+def warm_up_pipeline(pipeline: Pipeline, embedder_name="text_embedder", quantization: str | None = None,
+                     min_overlap=0.9) -> dict:
+    """
+    Loads every component of the pipeline and runs sample queries through the query embedder and the retrievers,
+    so the first question doesn't pay for loading the model, initializing torch and connecting to the document store.
+    Returns report with load time and embedding latency.
+    embedder_name - SentenceTransformersTextEmbedder of the pipeline, its receivers are treated as retrievers
+    quantization - None or "int8", the int8 model is kept only if its retrieval of the sample queries matches float32
+    min_overlap - minimum share of float32 top documents the int8 model has to retrieve for every sample query
+    """
+    start = time.perf_counter()
+    pipeline.warm_up()
+    report = {"load_seconds": time.perf_counter() - start}
+
+    embedder = pipeline.get_component(embedder_name)
+    retrievers = [pipeline.get_component(name) for name in pipeline.graph.successors(embedder_name)]
+
+    # The first inference is much slower than the following ones, it's not counted
+    embed_queries(embedder, SAMPLE_QUERIES[:1])
+    float_stats = LatencyStats()
+    float_embeddings = embed_queries(embedder, SAMPLE_QUERIES, float_stats)
+    report["float32_embed"] = float_stats.report()
+    report["quantization"] = None
+
+    if quantization == "int8":
+        float_backend = embedder.embedding_backend
+        try:
+            quantize_text_embedder(embedder)
+            embed_queries(embedder, SAMPLE_QUERIES[:1])
+            int8_stats = LatencyStats()
+            int8_embeddings = embed_queries(embedder, SAMPLE_QUERIES, int8_stats)
+            report["int8_embed"] = int8_stats.report()
+            report["int8_check"] = compare_retrieval(retrievers, float_embeddings, int8_embeddings)
+            if report["int8_check"]["min_overlap"] is not None and report["int8_check"]["min_overlap"] < min_overlap:
+                print(f"int8 query embedder retrieves different documents than float32 "
+                      f"({report['int8_check']}), keeping float32")
+                embedder.embedding_backend = float_backend
+            else:
+                report["quantization"] = "int8"
+        except RuntimeError as e:
+            print(f"Failed to quantize the query embedder, keeping float32: {e}")
+            embedder.embedding_backend = float_backend
+    elif quantization is not None:
+        raise ValueError(f"Unknown quantization: {quantization}")
+    else:
+        # Opens connections to the document stores
+        for retriever in retrievers:
+            retriever.run(query_embedding=float_embeddings[0])
+
+    report["startup_seconds"] = time.perf_counter() - start
+    return report
@@ -1,6 +1,6 @@
 import aiohttp
 import asyncio
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
 import re
 from datetime import datetime
 from bs4 import BeautifulSoup
@@ -8,6 +8,8 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import requests
 from collections import defaultdict
+from utils.http_cache import HttpCache, CachedSession
+from functools import lru_cache
 
 
 DATE_FORMATS = [
@@ -57,35 +59,73 @@ DATE_PATTERNS = [
     r'\b[A-Za-z]+\s+\d{1,2}\s+\d{4}\b'  # Matches September 20 2024 (no comma)
 ]
 
-
-# Asynchronous URL fetching with retry logic
-async def fetch_urls(url_to_fetch: str, session: aiohttp.ClientSession, retries=3) -> set[str]:
+# Formats that a match of each pattern can be parsed with, kept in DATE_FORMATS order
+DATE_PATTERN_FORMATS = {
+    r'\b\d{4}-\d{2}-\d{2}\b': ['%Y-%m-%d'],
+    r'\b\d{4}/\d{2}/\d{2}\b': ['%Y/%m/%d'],
+    r'\b\d{2}-\d{2}-\d{4}\b': ['%m-%d-%Y', '%d-%m-%Y'],
+    r'\b\d{2}/\d{2}/\d{4}\b': ['%m/%d/%Y', '%d/%m/%Y'],
+    r'\b\d{1,2}\s+[A-Za-z]+\s+\d{4}\b': ['%d %B %Y', '%d %b %Y'],
+    r'\b[A-Za-z]+\s+\d{1,2},\s+\d{4}\b': ['%B %d, %Y', '%b %d, %Y'],
+    r'\b\d{1,2}\s+[A-Za-z]{3}\s+\d{4}\b': ['%d %B %Y', '%d %b %Y'],
+    r'\b[A-Za-z]{3}\s+\d{1,2},\s+\d{4}\b': ['%B %d, %Y', '%b %d, %Y'],
+    r'\b\d{1,2}-[A-Za-z]{3}-\d{4}\b': ['%d-%b-%Y'],
+    r'\b[A-Za-z]{3}-\d{1,2}-\d{4}\b': ['%b-%d-%Y'],
+    r'\b[A-Za-z]+,\s+\d{1,2}\s+[A-Za-z]+\s+\d{4}\b': ['%A, %d %B %Y'],
+    r'\b[A-Za-z]+,\s+[A-Za-z]+\s+\d{1,2},\s+\d{4}\b': ['%A, %B %d, %Y'],
+    r'\b\d{4}\.\d{2}\.\d{2}\b': ['%Y.%m.%d'],
+    r'\b\d{2}\.\d{2}\.\d{4}\b': ['%d.%m.%Y'],
+    r'\b\d{4}\s+[A-Za-z]{3}\s+\d{1,2}\b': ['%Y %b %d', '%Y %B %d'],
+    r'\b\d{4}\s+[A-Za-z]+\s+\d{1,2}\b': ['%Y %b %d', '%Y %B %d'],
+    r'\b\d{1,2}\s+[A-Za-z]+,\s+\d{4}\b': ['%d %B, %Y'],
+    r'\b[A-Za-z]+\s+\d{1,2}\s+\d{4}\b': ['%B %d %Y']
+}
+
+
+# Asynchronous page fetching with retry logic
+async def fetch_page(url_to_fetch: str, session: aiohttp.ClientSession, retries=3) -> BeautifulSoup | None:
+    """
+    Returns parsed page or None if the page couldn't be fetched
+    """
     attempt = 0
     while attempt < retries:
         try:
             async with session.get(url_to_fetch, timeout=15) as response:
                 if response.status != 200:
                     # print(f"Couldn't fetch {url} - status {response.status}")
-                    return set()  # Return an empty set if the page doesn't load
+                    return None  # Return None if the page doesn't load
                 text_content = await response.text()
-                soup = BeautifulSoup(text_content, "html.parser")
-                urls = set(
-                    urljoin(url_to_fetch, link['href'])
-                    for link in soup.find_all('a', href=True)
-                    if urlparse(urljoin(url_to_fetch, link['href'])).scheme in ('http', 'https')
-                )
                 # if attempt > 0: print(f"Successfully fetched URL: {url} on attempt {attempt + 1}")
-                return urls
+                return BeautifulSoup(text_content, "html.parser")
         except (aiohttp.ClientError, asyncio.TimeoutError):
             attempt += 1
             if attempt < retries:
                 await asyncio.sleep(2 ** attempt)  # Exponential backoff
         except Exception as e:
             print(e)
-            return set()
+            return None
 
     print(f"Failed to fetch URL {url_to_fetch} after {retries} attempts.")
-    return set()
+    return None
+
+
+# Extract absolute http(s) links from a parsed page, skipping hrefs that can't be parsed
+def extract_urls(page_url: str, soup: BeautifulSoup) -> set[str]:
+    urls = set()
+    for link in soup.find_all('a', href=True):
+        try:
+            url = urljoin(page_url, link['href'])
+            if urlparse(url).scheme in ('http', 'https'):
+                urls.add(url)
+        except ValueError:  # e.g. "Invalid IPv6 URL"
+            continue
+    return urls
+
+
+# Asynchronous URL fetching with retry logic
+async def fetch_urls(url_to_fetch: str, session: aiohttp.ClientSession, retries=3) -> set[str]:
+    soup = await fetch_page(url_to_fetch, session, retries)
+    return extract_urls(url_to_fetch, soup) if soup is not None else set()
 
 
 # Check if URL should be allowed
@@ -100,39 +140,106 @@ def is_url_allowed(url_to_check: str, special_list: dict[str, list[str]] | None)
     return True
 
 
-# Asynchronous scraping with blacklist/whitelist and depth handling
-async def scrape_urls(current_url: str, session: aiohttp.ClientSession, max_depth: int, current_depth=0, visited=None,
-                      list_data=None) -> list[str]:
-    if visited is None:
-        visited = []
+# Normalize URL so that equivalent links share a single key in the crawl frontier
+def normalize_url(url_to_normalize: str) -> str:
+    """
+    Returns url without fragment, with sorted query params, lowercase scheme/host
+    and without trailing slash (except for the root path)
+    """
+    parsed = urlparse(url_to_normalize)
+    path = parsed.path.rstrip('/') or '/'
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), path, parsed.params, query, ''))
 
-    if current_depth > max_depth:
-        return visited  # Stop recursion if depth limit exceeded
 
-    visited.append(current_url)  # Store URL with its depth
-    # Extract URLs from the current page
-    urls = await fetch_urls(current_url, session)
+# Asynchronous breadth-first crawl with blacklist/whitelist and depth handling
+async def crawl_pages(entry_url: str, session: aiohttp.ClientSession, max_depth: int, list_data=None,
+                      max_concurrency=10, per_host_concurrency=4, fetch_last_level=False):
+    """
+    Async generator yielding (url, soup) as soon as each page is fetched.
+    Crawls level by level, every normalized URL is fetched at most once.
+    soup is None if the page couldn't be fetched, or if it's on the last level and fetch_last_level is False
+    max_concurrency - number of workers draining the queue of the current level
+    per_host_concurrency - maximum number of in-flight requests to a single host
+    """
+    entry_url = urlparse(entry_url)._replace(fragment='').geturl()
+    seen = {normalize_url(entry_url)}
+    current_level = [entry_url]
+    host_limits = defaultdict(lambda: asyncio.Semaphore(per_host_concurrency))
+
+    for current_depth in range(max_depth + 1):
+        is_last_level = current_depth == max_depth
+        if is_last_level and not fetch_last_level:
+            # Links of these pages would be beyond the depth limit anyway
+            for url in current_level:
+                yield url, None
+            return
+
+        queue = asyncio.Queue()
+        for url in current_level:
+            queue.put_nowait(url)
+        # Bounded, so a slow consumer pauses the workers instead of piling up parsed pages
+        pages = asyncio.Queue(maxsize=max_concurrency)
+        next_level = []
+
+        async def worker():
+            while not queue.empty():
+                url_to_fetch = queue.get_nowait()
+                soup = None
+                try:
+                    async with host_limits[urlparse(url_to_fetch).netloc]:
+                        soup = await fetch_page(url_to_fetch, session)
+
+                    # No await between the check and the add, so two workers can't claim the same URL
+                    if soup is not None and not is_last_level:
+                        for new_url in extract_urls(url_to_fetch, soup):
+                            key = normalize_url(new_url)
+                            if key not in seen and is_url_allowed(new_url, list_data):
+                                seen.add(key)
+                                next_level.append(urlparse(new_url)._replace(fragment='').geturl())
+                except Exception as e:
+                    # The worker keeps draining the queue, every URL taken from it still yields a result
+                    print(f"Failed to crawl {url_to_fetch}: {e}")
+                finally:
+                    await pages.put((url_to_fetch, soup))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(max_concurrency, len(current_level)))]
+        try:
+            for _ in range(len(current_level)):
+                yield await pages.get()
+        finally:
+            for task in workers:
+                task.cancel()
 
-    tasks = []
-    for new_url in urls:
-        if new_url not in visited and is_url_allowed(new_url, list_data):
-            # Continue scraping at the next depth level if within depth limit
-            if current_depth < max_depth:
-                tasks.append(scrape_urls(new_url, session, max_depth, current_depth + 1, visited, list_data))
+        current_level = next_level
+        if not current_level:
+            return
 
-    # Await all the tasks concurrently
-    await asyncio.gather(*tasks)
-    return visited
+
+# Asynchronous scraping with blacklist/whitelist and depth handling
+async def scrape_urls(entry_url: str, session: aiohttp.ClientSession, max_depth: int, list_data=None,
+                      max_concurrency=10, per_host_concurrency=4) -> list[str]:
+    return [url async for url, _ in crawl_pages(entry_url, session, max_depth, list_data,
+                                                max_concurrency, per_host_concurrency)]
 
 
 # Entry point for asynchronous scraping
-async def start_scraping(entry_url: str, depth: int, list_data=None) -> list[str]:
+async def start_scraping(entry_url: str, depth: int, list_data=None, max_concurrency=10,
+                         per_host_concurrency=4, cache: HttpCache | None = None) -> list[str]:
     """
     Returns list of scraped urls
     list_data - dict{'white_list': [str], 'black_list': [str]}
+    max_concurrency - global limit of in-flight requests
+    per_host_concurrency - limit of in-flight requests to a single host
+    cache - on-disk cache, unchanged pages are revalidated with conditional requests instead of downloaded
     """
-    async with aiohttp.ClientSession() as session:
-        found_urls = await scrape_urls(entry_url, session, depth, list_data=list_data)
+    connector = aiohttp.TCPConnector(limit=max_concurrency, limit_per_host=per_host_concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        if cache is not None:
+            session = CachedSession(session, cache)
+        found_urls = await scrape_urls(entry_url, session, depth, list_data=list_data,
+                                       max_concurrency=max_concurrency,
+                                       per_host_concurrency=per_host_concurrency)
     return found_urls
 
 
@@ -163,16 +270,52 @@ def get_latest_date(dates, date_formats):
     return max(valid_dates).strftime('%Y-%m-%d') if valid_dates else "Unknown"
 
 
+@lru_cache(maxsize=32)
+def compile_date_engine(date_patterns: tuple[str, ...],
+                        date_formats: tuple[str, ...]) -> tuple[re.Pattern, dict[str, tuple[str, ...]]]:
+    """
+    Returns single regex with a named group per pattern and formats implied by each group.
+    Every pattern sits inside a lookahead, so one scan finds overlapping matches
+    the same way as separate re.findall calls for each pattern.
+    Patterns missing from DATE_PATTERN_FORMATS and formats missing from DATE_FORMATS are tried for every match.
+    """
+    unique_patterns = list(dict.fromkeys(date_patterns))
+    alternatives = '|'.join(f'(?P<p{i}>{pattern})' for i, pattern in enumerate(unique_patterns))
+    combined = re.compile(rf'\b(?=\w)(?=(?:{alternatives}))')
+
+    group_formats = {}
+    for i, pattern in enumerate(unique_patterns):
+        implied = DATE_PATTERN_FORMATS.get(pattern)
+        group_formats[f'p{i}'] = tuple(
+            date_format for date_format in date_formats
+            if implied is None or date_format in implied or date_format not in DATE_FORMATS
+        )
+    return combined, group_formats
+
+
+@lru_cache(maxsize=4096)
+def parse_date_cached(date_str: str, date_formats: tuple[str, ...]) -> datetime | None:
+    return parse_date(date_str, date_formats)
+
+
+def find_latest_date(text: str, date_formats, date_patterns) -> str:
+    """Return the latest valid date in text, scanning it once with the combined regex."""
+    combined, group_formats = compile_date_engine(tuple(date_patterns), tuple(date_formats))
+    latest = None
+    for match in combined.finditer(text):
+        group = match.lastgroup
+        parsed = parse_date_cached(match.group(group), group_formats[group])
+        if parsed is not None and (latest is None or parsed > latest):
+            latest = parsed
+    return latest.strftime('%Y-%m-%d') if latest else "Unknown"
+
+
 def extract_date(my_soup: BeautifulSoup, date_formats, date_patterns) -> str:
     # Extract all text content to search for a date pattern
     text_content = my_soup.get_text(separator=' ', strip=True)
 
-    # Use regex to find all dates in the page's text content
-    dates = find_all_dates_with_regex(text_content, date_patterns)
-
     # Get the latest date found
-    latest_date = get_latest_date(dates, date_formats)
-    return latest_date
+    return find_latest_date(text_content, date_formats, date_patterns)
 
 
 def requests_retry_session(
@@ -195,6 +338,46 @@ def requests_retry_session(
     return session
 
 
+def parse_content_and_metadata(url: str, soup: BeautifulSoup, date_formats: list[str],
+                               date_patterns: list[str]) -> list[dict]:
+    """
+    Returns list of dictionaries {content: string, metadata: dict} for already parsed page
+    content - cleaned html text split by headlines
+    metadata - url, title, headline, date
+    """
+    title = soup.title.string if soup.title else "Unknown"
+    date = extract_date(soup, date_formats, date_patterns)
+
+    content_by_headline = defaultdict(str)
+    current_header = None
+
+    # Loop through the elements, keeping track of headlines and paragraphs
+    for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'pre']):
+        if element.name.startswith('h'):
+            # Headline
+            current_header = element.get_text(strip=True)
+            current_header = current_header.replace("\n", "")
+            current_header = re.sub(r"\s+", " ", current_header)
+            current_header = re.sub(r'[^\x00-\x7F]+', '', current_header)
+
+        elif element.name in ['p', 'pre'] and current_header:
+            # Append the text under the last seen headline
+            if element.name == 'pre':
+                # Fenced, so the chunker keeps the code block whole
+                new_content = "```\n" + element.get_text(strip=False).strip("\n") + "\n```"
+            else:
+                new_content = re.sub(r'\s+', ' ', element.get_text(strip=False)).replace("\n", " ")
+            content_by_headline[current_header] += f"\n{new_content}"
+
+    result_dicts = []
+    for headline, content in content_by_headline.items():
+        result_dicts.append(
+            # [1:] because each content starts with '\n'
+            {"content": content[1:], "metadata": {"url": url, "title": title, "headline": headline, "date": date}})
+
+    return result_dicts
+
+
 def extract_content_and_metadata(url: str, date_formats: list[str], date_patterns: list[str]) -> list[dict] | None:
     """
     Returns list of dictionaries {content: string, metadata: dict}
@@ -210,37 +393,30 @@ def extract_content_and_metadata(url: str, date_formats: list[str], date_pattern
         response.raise_for_status()
 
         soup = BeautifulSoup(response.content, 'html.parser')
-        title = soup.title.string if soup.title else "Unknown"
-        date = extract_date(soup, date_formats, date_patterns)
-
-        content_by_headline = defaultdict(str)
-        current_header = None
-
-        # Loop through the elements, keeping track of headlines and paragraphs
-        for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'pre']):
-            if element.name.startswith('h'):
-                # Headline
-                current_header = element.get_text(strip=True)
-                current_header = current_header.replace("\n", "")
-                current_header = re.sub(r"\s+", " ", current_header)
-                current_header = re.sub(r'[^\x00-\x7F]+', '', current_header)
-
-            elif element.name in ['p', 'pre'] and current_header:
-                # Append the text under the last seen headline
-                if element.name == 'pre':
-                    new_content = element.get_text(strip=False)
-                else:
-                    new_content = re.sub(r'\s+', ' ', element.get_text(strip=False)).replace("\n", " ")
-                content_by_headline[current_header] += f"\n{new_content}"
-
-        result_dicts = []
-        for headline, content in content_by_headline.items():
-            result_dicts.append(
-                # [1:] because each content starts with '\n'
-                {"content": content[1:], "metadata": {"url": url, "title": title, "headline": headline, "date": date}})
-
-        return result_dicts
+        return parse_content_and_metadata(url, soup, date_formats, date_patterns)
 
     except requests.exceptions.RequestException as e:
         print(f"Error fetching {url}: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+async def crawl_and_extract(entry_url: str, depth: int, date_formats: list[str], date_patterns: list[str],
+                            list_data=None, max_concurrency=10, per_host_concurrency=4,
+                            cache: HttpCache | None = None):
+    """
+    Async generator yielding dictionaries {content: string, metadata: dict} while crawling.
+    Single pass alternative to start_scraping + extract_content_and_metadata,
+    each page is downloaded and parsed once for both its links and its content.
+    list_data - dict{'white_list': [str], 'black_list': [str]}
+    cache - on-disk cache, unchanged pages are revalidated with conditional requests instead of downloaded
+    """
+    connector = aiohttp.TCPConnector(limit=max_concurrency, limit_per_host=per_host_concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        if cache is not None:
+            session = CachedSession(session, cache)
+        async for url, soup in crawl_pages(entry_url, session, depth, list_data, max_concurrency,
+                                           per_host_concurrency, fetch_last_level=True):
+            if soup is None:
+                continue
+            for section in parse_content_and_metadata(url, soup, date_formats, date_patterns):
+                yield section